@@ -1,4 +1,18 @@
-import os, sys, random, time, pygame
+import os, io, sys, gc, random, time, json, argparse, pygame
+import numpy as np
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from entities import EntityStore
+from profiler import FrameProfiler
+from audio import VoiceManager
+from atlas import SHEETS, load_atlas, atlas_files, atlas_frames
+from assetpack import AssetPack
+from keywords import STORY_MATCHER
+from levelgen import iter_levels, iter_timeline, load_spec, LevelStream, DEFAULT_SPEC, GENERATOR_VERSION
+from timeline import iter_windows, analyze, WINDOW_WORDS, MIN_WINDOWS, MAX_SEGMENTS, ANALYZER_VERSION
+from storycache import StoryCache, story_key, digest
+from replay import Recorder, Replay
+from classifier import StoryClassifier, MODEL_PATH, VECT_PATH, MLB_PATH, SPACE_KEYWORDS, keyword_override_space, mode_from_labels
 
 def get_story_with_tkinter(default_text):
     try:
@@ -48,172 +62,451 @@ def get_story_with_tkinter(default_text):
 
 DEFAULT_STORY = "A knight walks through the forest, later crosses a desert and finds a tomb."
 
-story = get_story_with_tkinter(DEFAULT_STORY)
-if story is None:
-    try:
-        story = input("Enter your story (press Enter for default): ").strip()
-    except Exception:
-        story = ""
-if not story:
-    story = DEFAULT_STORY
-story_l = story.lower()
-
-MODEL_PATH = "story_model.joblib"
-VECT_PATH = "vectorizer.joblib"
-model = None
-vect = None
-use_model = False
-model_label_names = None
-
-try:
-    import joblib
-    if os.path.exists(MODEL_PATH) and os.path.exists(VECT_PATH):
-        model = joblib.load(MODEL_PATH)
-        vect = joblib.load(VECT_PATH)
-        use_model = True
-        print("Loaded ML model & vectorizer.")
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="StoryToGame")
+    ap.add_argument("--headless", action="store_true", help="simulate playthroughs with no window, audio or frame cap")
+    ap.add_argument("--runs", type=int, default=100, help="headless playthroughs to simulate")
+    ap.add_argument("--seed", type=int, help="base seed; headless run i uses seed+i (default 0), a recording uses it as its seed")
+    ap.add_argument("--inputs", default="random", help="'random' or a script such as 'RIGHT:40,RIGHT+A:10,SPACE:5'")
+    ap.add_argument("--max-ticks", type=int, default=20000, help="give up on a headless run after this many ticks")
+    ap.add_argument("--mode", choices=["knight", "space"], help="force the campaign instead of classifying the story")
+    ap.add_argument("--full-flip", action="store_true", help="redraw and flip the whole frame every tick")
+    ap.add_argument("--verbose", action="store_true", help="keep per-level logging in headless mode")
+    ap.add_argument("--story", help="story text; skips the Tk prompt")
+    ap.add_argument("--story-file", help="read the story from a file ('-' for stdin); skips the Tk prompt")
+    ap.add_argument("--levels", type=int, help="generate a campaign of this many levels from the story's labels")
+    ap.add_argument("--level-seed", type=int, default=0, help="seed for generated campaigns")
+    ap.add_argument("--spec", help="JSON level spec replacing the built-in one (see levelgen.py)")
+    ap.add_argument("--trace", help="write per-frame phase timings and counts to this CSV (or .jsonl) file")
+    ap.add_argument("--overlay", action="store_true", help="start with the profiling overlay shown (F3 toggles, F9 samples with cProfile)")
+    ap.add_argument("--profile-dir", default="profiles", help="where F9 cProfile dumps are written")
+    ap.add_argument("--render-fps", type=int, default=FPS, help="frames drawn per second; logic always ticks at 60 Hz")
+    ap.add_argument("--max-frame-skip", type=int, default=5, help="logic ticks run per drawn frame before the backlog is dropped")
+    ap.add_argument("--record", metavar="PATH", help="record the seed, story and every frame's keys to a replay file")
+    ap.add_argument("--replay", metavar="PATH", help="play a recorded replay instead of reading the keyboard")
+    ap.add_argument("--playback", choices=["realtime", "fast", "headless"], default="realtime",
+                    help="replay speed: at FPS, uncapped with drawing, or simulation only (implied by --headless)")
+    return ap.parse_args(argv)
+
+HEADLESS = os.environ.get("STORYTOGAME_HEADLESS") == "1"
+VERBOSE = not HEADLESS
+FULL_FLIP = os.environ.get("STORYTOGAME_FULL_FLIP") == "1"
+RENDER_FPS = None
+MAX_FRAME_SKIP = 5
+PROFILER = FrameProfiler()
+
+def log(*args):
+    if VERBOSE: print(*args)
+
+def read_story(args):
+    if args.story_file:
+        if args.story_file == "-":
+            return sys.stdin.read().strip() or DEFAULT_STORY
+        with open(args.story_file, encoding="utf-8") as f:
+            return f.read().strip() or DEFAULT_STORY
+    if args.story is not None:
+        return args.story.strip() or DEFAULT_STORY
+    if HEADLESS:
+        return DEFAULT_STORY
+    story = get_story_with_tkinter(DEFAULT_STORY)
+    if story is None:
         try:
-            if hasattr(model, "classes_"):
-                model_label_names = list(getattr(model, "classes_"))
-                print("Model.classes_ found:", model_label_names)
-            elif hasattr(model, "estimators_"):
-                names = []
-                for est in getattr(model, "estimators_"):
-                    if hasattr(est, "classes_"):
-                        names.append(list(est.classes_))
-                    else:
-                        names.append(None)
-                model_label_names = names
-                print("Model estimators classes found.")
-            else:
-                print("No label metadata found inside model.")
-        except Exception as e:
-            print("Could not inspect model labels:", e)
-    else:
-        print("Model/vectorizer not found; using keyword fallback.")
-except Exception as e:
-    print("joblib/sklearn not available or failed to load model:", e)
-    use_model = False
+            story = input("Enter your story (press Enter for default): ").strip()
+        except Exception:
+            story = ""
+    return story or DEFAULT_STORY
+
+classifier = StoryClassifier(MODEL_PATH, VECT_PATH, MLB_PATH, cache=StoryCache())
+TIMELINE_WORDS = 300   # longer stories are classified window by window into a level timeline (timeline.py)
 
-SPACE_KEYWORDS = ["space", "alien", "ship", "spaceship", "galaxy", "asteroid", "planet", "nebula", "ufo", "mothership"]
+def long_story(story):
+    return len(story.split()) > TIMELINE_WORDS
 
-def keyword_override_space(s):
-    return any(k in s for k in SPACE_KEYWORDS)
+def story_timeline(story, use_model=True, spec=None):
+    clf = classifier if use_model and classifier.load() else None
+    key = story_key(story, "timeline", ANALYZER_VERSION, clf.fingerprint() if clf else "keywords", WINDOW_WORDS, MIN_WINDOWS,
+                    MAX_SEGMENTS, digest(STORY_MATCHER.table), digest((spec or DEFAULT_SPEC)["knight"]["labels"]))
+    tl = classifier.cache.get(key)
+    if tl is None:
+        tl = analyze(iter_windows(story.splitlines()), clf, spec, min_windows=MIN_WINDOWS, max_segments=MAX_SEGMENTS)
+        classifier.cache.put(key, tl)
+    return tl
 
-def choose_mode_from_model_safe(story_text):
-    if not use_model or model is None or vect is None:
+def choose_mode_from_model_safe(story_text, timeline=None):
+    if not classifier.load():
         return None
     try:
-        X = vect.transform([story_text])
-        pred = model.predict(X)
-        print("Raw model output:", repr(pred))
-        if hasattr(pred, "__len__") and not hasattr(pred[0], "__len__"):
-            first = pred[0]
-            fs = str(first).lower()
-            if "space" in fs or "alien" in fs or "ship" in fs:
-                return "space"
-            return "knight"
-        import numpy as _np
-        arr = _np.array(pred)
-        if arr.ndim == 2 and arr.shape[0] >= 1:
-            vec = arr[0]
-            if model_label_names and isinstance(model_label_names, list) and all(isinstance(x, str) for x in model_label_names) and len(model_label_names) == len(vec):
-                chosen = [model_label_names[i] for i,v in enumerate(vec) if int(v)]
-                print("Mapped labels from model:", chosen)
-                if any("space" in c.lower() or "alien" in c.lower() or "ship" in c.lower() for c in chosen):
-                    return "space"
-                return "knight"
-            if vec.sum() == 0:
-                return None
-            print("Model returned numeric vector but mapping unknown -> fallback to keywords.")
+        if long_story(story_text):
+            tl = timeline or story_timeline(story_text)
+            print(f"Story timeline: {tl['windows']} windows ->", [s["biome"] for s in tl["segments"]] or "no biomes")
+            if tl["model_labels"]:
+                print("Mapped labels from model:", tl["model_labels"])
+                return mode_from_labels(tl["model_labels"])
             return None
+        res = classifier.classify_batch([story_text])[0]; labels = res["labels"]
+        print("Model label probabilities:", {k: round(v, 3) for k, v in res["probs"].items()})
+        if labels:
+            print("Mapped labels from model:", labels)
+            return mode_from_labels(labels)
+        return None
     except Exception as e:
         print("Model inference error:", e)
         return None
-    return None
 
-if keyword_override_space(story_l):
-    chosen_mode = "space"
-    print("Keyword override selected SPACE mode.")
-else:
-    mc = choose_mode_from_model_safe(story)
+def story_labels(story, use_model=True, timeline=None):
+    # timeline: the story's story_timeline() result when the caller already has it
+    if long_story(story):
+        return (timeline or story_timeline(story, use_model))["labels"]
+    if use_model and classifier.load():
+        try:
+            res = classifier.classify_batch([story])[0]
+            return res["keywords"] + res["labels"]
+        except Exception as e:
+            print("Model inference error:", e)
+    return STORY_MATCHER.labels(story)
+
+def make_campaign(mode, story, length=None, seed=0, spec=None, labels=None, timeline=None):
+    if timeline is None and mode == "knight" and long_story(story):
+        timeline = story_timeline(story, spec=spec)["segments"]
+    if timeline:
+        if length is None:
+            return list(iter_timeline(mode, timeline, None, seed, spec))
+        return LevelStream(lambda: iter_timeline(mode, timeline, length, seed, spec), length)
+    if length is None and labels is None:
+        key = story_key(story, "levels", GENERATOR_VERSION, mode, seed, digest(spec or DEFAULT_SPEC), digest(STORY_MATCHER.table))
+        levels = classifier.cache.get(key)
+        if levels is None:
+            levels = list(iter_levels(mode, STORY_MATCHER.labels(story), None, seed, spec))
+            classifier.cache.put(key, levels)
+        return levels
+    if labels is None:
+        labels = story_labels(story)
+    if length is None:
+        return list(iter_levels(mode, labels, None, seed, spec))
+    return LevelStream(lambda: iter_levels(mode, labels, length, seed, spec), length)
+
+def choose_mode(story, timeline=None):
+    if keyword_override_space(story.lower()):
+        print("Keyword override selected SPACE mode.")
+        return "space"
+    mc = choose_mode_from_model_safe(story, timeline)
     if mc:
-        chosen_mode = mc
-        print("Chosen by model:", chosen_mode)
-    else:
-        chosen_mode = "knight"
-        print("Falling back to KNIGHT mode (no strong model decision).")
+        print("Chosen by model:", mc)
+        return mc
+    print("Falling back to KNIGHT mode (no strong model decision).")
+    return "knight"
 
-pygame.init()
 WIDTH, HEIGHT = 960, 540
 FPS = 60
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("StoryToGame - Final")
-clock = pygame.time.Clock()
-FONT = pygame.font.SysFont(None, 24)
+FIXED_DT = 1000 // FPS   # whole-ms tick of the headless simulation and the env
+TICK_MS = 1000 / FPS     # a real-time tick; SimClock hands out its dt in whole ms that add up to this
+screen = None
+clock = None
+FONT = None
+
+def init_display():
+    global screen, clock, FONT
+    if screen is not None:
+        return screen
+    if HEADLESS:
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    pygame.display.init(); pygame.font.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("StoryToGame - Final")
+    clock = pygame.time.Clock()
+    FONT = pygame.font.SysFont(None, 24)
+    return screen
 
 ASSETS_DIR = "assets"
+ATLAS_DIR = os.path.join(ASSETS_DIR, "atlas")
+PACK = AssetPack.open()   # built by assetpack.py; files it holds are read from it, anything else from ASSETS_DIR
 GROUND_Y = HEIGHT - 72
 
 def asset_path(subfolder, name):
     return os.path.join(ASSETS_DIR, subfolder, name)
 
-def exists(subfolder, name):
-    return os.path.exists(asset_path(subfolder, name))
+def pack_key(path):
+    return os.path.relpath(path, ASSETS_DIR).replace(os.sep, "/")
 
-def load_image(subfolder, name, fallback_size=(64,64), fallback_color=(80,80,80)):
+def exists(subfolder, name):
     p = asset_path(subfolder, name)
-    if os.path.exists(p):
+    return (PACK is not None and pack_key(p) in PACK) or os.path.exists(p)
+
+def read_image(path):
+    if PACK is not None:
+        key = pack_key(path)
+        if key in PACK:
+            return PACK.image(key)
+    return pygame.image.load(path) if os.path.exists(path) else None
+
+def decode_file(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    return pygame.image.load(io.BytesIO(data), os.path.basename(path))
+
+class Prefetcher:
+    # reads and decodes upcoming level art on worker threads; load_image picks the result up and converts it on the main thread
+    def __init__(self, workers=2, enabled=True):
+        self.workers=workers; self.enabled=enabled
+        self.pool=None; self.pending={}
+        self.requested=0; self.used=0
+    def request(self, subfolder, name):
+        p = asset_path(subfolder, name) if name else None
+        if not self.enabled or p is None or p in self.pending or (PACK is not None and pack_key(p) in PACK) or not os.path.exists(p):
+            return
+        if self.pool is None:
+            self.pool = ThreadPoolExecutor(self.workers, thread_name_prefix="prefetch")
+        self.pending[p] = self.pool.submit(decode_file, p); self.requested += 1
+    def take(self, path):
+        fut = self.pending.pop(path, None)
+        if fut is None:
+            return None
         try:
-            return pygame.image.load(p).convert_alpha()
+            img = fut.result(); self.used += 1
+            return img
         except Exception as e:
-            print("Error loading image", p, e)
-    s = pygame.Surface(fallback_size, pygame.SRCALPHA); s.fill(fallback_color)
-    return s
+            print("Prefetch failed for", path, e)
+            return None
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True); self.pool = None
+        self.pending.clear()
 
-castle_path = asset_path("knight", "castle.png")
-if not os.path.exists(castle_path):
+PREFETCH = Prefetcher(enabled=not HEADLESS)
+
+def load_image(subfolder, name, fallback_size=(64,64), fallback_color=(80,80,80)):
+    p = asset_path(subfolder, name)
     try:
-        print("Castle not found — creating placeholder at", castle_path)
-        os.makedirs(os.path.dirname(castle_path), exist_ok=True)
-        surf = pygame.Surface((120, 160), pygame.SRCALPHA)
-        surf.fill((50,60,80))
-        pygame.draw.rect(surf, (140,140,160), (12,60,96,88))
-        pygame.draw.rect(surf, (100,100,120), (22,30,24,40))
-        pygame.draw.rect(surf, (100,100,120), (74,30,24,40))
-        pygame.draw.rect(surf, (80,80,100), (40,90,40,58))
-        pygame.image.save(surf, castle_path)
-        print("Placeholder castle created.")
+        img = PREFETCH.take(p)
+        if img is None: img = read_image(p)
+        if img is not None: return img.convert_alpha()
     except Exception as e:
-        print("Failed to create castle placeholder:", e)
-
-try:
-    pygame.mixer.init()
-    SOUND_ENABLED = True
-except Exception as e:
-    print("Warning: audio mixer init failed:", e)
-    SOUND_ENABLED = False
-
-def load_sfx(folder, filename):
-    path = os.path.join(ASSETS_DIR, folder, "sfx", filename)
-    if SOUND_ENABLED and os.path.exists(path):
-        try:
-            return pygame.mixer.Sound(path)
-        except Exception as e:
-            print("Failed to load SFX:", path, e)
+        print("Error loading image", p, e)
+    s = pygame.Surface(fallback_size, pygame.SRCALPHA); s.fill(fallback_color)
+    return s
+
+def surface_bytes(surf):
+    return surf.get_pitch() * surf.get_height() if surf is not None else 0
+
+class SurfaceCache:
+    def __init__(self, max_bytes=64*1024*1024):
+        self.max_bytes=max_bytes; self.bytes=0
+        self.hits=0; self.misses=0; self.evictions=0
+        self.items=OrderedDict()
+    def get(self, key, factory):
+        if key in self.items:
+            self.items.move_to_end(key); self.hits+=1
+            return self.items[key][0]
+        self.misses+=1
+        surf = factory()
+        size = surface_bytes(surf)
+        if size > self.max_bytes:
+            return surf
+        self.items[key] = (surf, size); self.bytes += size
+        while self.bytes > self.max_bytes:
+            _, (_, old) = self.items.popitem(last=False)
+            self.bytes -= old; self.evictions += 1
+        return surf
+    def __contains__(self, key):
+        return key in self.items
+    def discard(self, key):
+        item = self.items.pop(key, None)
+        if item: self.bytes -= item[1]
+    def clear(self):
+        self.items.clear(); self.bytes=0
+    def stats(self):
+        total = self.hits + self.misses
+        return {"items": len(self.items), "bytes": self.bytes, "max_bytes": self.max_bytes,
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "hit_rate": self.hits/total if total else 0.0}
+
+ASSET_CACHE = SurfaceCache(int(os.environ.get("STORYTOGAME_CACHE_MB", "64")) * 1024 * 1024)
+
+def first_existing(subfolder, names):
+    for name in names:
+        if exists(subfolder, name): return name
     return None
 
-sfx_sword_swipe    = load_sfx("knight", "sword_swipe.wav")
-sfx_sword_hit      = load_sfx("knight", "sword_hit.wav")
-sfx_level_complete = load_sfx("knight", "level_complete.wav")
+def load_scaled(subfolder, names, size, fallback_color=None):
+    def build():
+        name = first_existing(subfolder, names)
+        if name is None:
+            if fallback_color is None: return None
+            s = pygame.Surface(size); s.fill(fallback_color)
+            return s
+        return pygame.transform.scale(load_image(subfolder, name, size), size)
+    return ASSET_CACHE.get((subfolder, tuple(names), size), build)
+
+def cached_image(subfolder, name, size):
+    return ASSET_CACHE.get((subfolder, name, size),
+                           lambda: pygame.transform.scale(load_image(subfolder, name, size), size))
+
+def castle_placeholder():
+    surf = pygame.Surface((120, 160), pygame.SRCALPHA)
+    surf.fill((50,60,80))
+    pygame.draw.rect(surf, (140,140,160), (12,60,96,88))
+    pygame.draw.rect(surf, (100,100,120), (22,30,24,40))
+    pygame.draw.rect(surf, (100,100,120), (74,30,24,40))
+    pygame.draw.rect(surf, (80,80,100), (40,90,40,58))
+    return surf
+
+AUDIO = VoiceManager()
+
+def init_audio(mode):
+    if HEADLESS:
+        return False
+    return AUDIO.init(ASSETS_DIR, mode, PACK)
+
+class Renderer:
+    def __init__(self, surface, full_flip=None):
+        self.surface=surface; self.full_flip=FULL_FLIP if full_flip is None else full_flip
+        self.background=None; self.full_redraw=True
+        self.prev=[]; self.dirty=[]
+    def set_background(self, background):
+        self.background=background; self.full_redraw=True; self.prev=[]
+    def begin(self):
+        self.dirty=[]
+        if self.full_flip or self.full_redraw:
+            self.surface.blit(self.background,(0,0))
+        else:
+            for r in self.prev:
+                self.surface.blit(self.background, r, r)
+    def draw(self, *groups, offset=0):
+        if not offset:
+            for g in groups:
+                self.dirty.extend(g.draw(self.surface))
+            return
+        bounds = self.surface.get_rect()
+        for g in groups:
+            for s in g:
+                r = s.rect.move(-offset, 0)
+                if r.colliderect(bounds):
+                    self.dirty.append(self.surface.blit(s.image, r))
+    def blits(self, seq):
+        if seq:
+            self.dirty.extend(self.surface.blits(seq))
+    def mark(self, rect):
+        self.dirty.append(pygame.Rect(rect))
+    def present(self):
+        if self.full_flip or self.full_redraw:
+            pygame.display.flip()
+        else:
+            pygame.display.update(self.prev + self.dirty)
+        self.full_redraw=False; self.prev=self.dirty
+
+def profiler_key(key):
+    if key == pygame.K_F3:
+        PROFILER.toggle_overlay()
+    elif key == pygame.K_F9:
+        PROFILER.toggle_cprofile()
+
+def draw_overlay(renderer):
+    if not PROFILER.overlay:
+        return
+    y = 32
+    for line in PROFILER.overlay_lines():
+        img = FONT.render(line, True, (255,255,0))
+        renderer.mark(screen.blit(img, (WIDTH - img.get_width() - 8, y))); y += 18
+
+def cache_telemetry():
+    st = ASSET_CACHE.stats()
+    return {"cache_hit_rate": st["hit_rate"], "cache_mb": st["bytes"] / (1024*1024), **AUDIO.telemetry()}
+
+KEY_BITS = {pygame.K_LEFT:1, pygame.K_RIGHT:2, pygame.K_UP:4, pygame.K_DOWN:8, pygame.K_SPACE:16, pygame.K_a:32}
+KEY_NAMES = {"LEFT":pygame.K_LEFT, "RIGHT":pygame.K_RIGHT, "UP":pygame.K_UP, "DOWN":pygame.K_DOWN, "SPACE":pygame.K_SPACE, "A":pygame.K_a}
+
+class KeyMask:
+    __slots__ = ("mask",)
+    def __init__(self, mask=0):
+        self.mask = mask
+    def __getitem__(self, key):
+        return bool(self.mask & KEY_BITS.get(key, 0))
+
+def keys_to_mask(keys):
+    return sum(bit for k,bit in KEY_BITS.items() if keys[k])
+
+class RandomInputs:
+    def __init__(self, rng, hold=8):
+        self.rng=rng; self.hold=hold; self.left=0; self.keys=KeyMask()
+    def next(self):
+        if self.left <= 0:
+            self.keys.mask = self.rng.getrandbits(len(KEY_BITS)); self.left = self.rng.randint(1, self.hold)
+        self.left -= 1
+        return self.keys
+
+class ScriptedInputs:
+    def __init__(self, script):
+        self.steps=[]
+        for part in script.split(","):
+            names, _, count = part.strip().rpartition(":")
+            mask = sum(KEY_BITS[KEY_NAMES[n.strip().upper()]] for n in names.split("+") if n.strip())
+            self.steps.append((mask, int(count)))
+        self.i=0; self.left=self.steps[0][1]; self.keys=KeyMask(self.steps[0][0])
+    def next(self):
+        while self.left <= 0:
+            self.i = (self.i+1) % len(self.steps)
+            self.keys.mask, self.left = self.steps[self.i]
+        self.left -= 1
+        return self.keys
+
+def make_inputs(spec, rng):
+    return RandomInputs(rng) if spec == "random" else ScriptedInputs(spec)
 
-sfx_laser          = load_sfx("space", "laser.wav")
-sfx_explosion      = load_sfx("space", "explosion.wav")
-sfx_ship_hit       = load_sfx("space", "ship_hit.wav")
+class LiveControls:
+    def __init__(self, recorder=None):
+        self.recorder=recorder; self.keys=KeyMask()
+    def read(self, dt):
+        self.keys.mask = keys_to_mask(pygame.key.get_pressed())
+        if self.recorder: self.recorder.frame(self.keys.mask, dt)
+        return self.keys, dt
+
+class ReplayControls:
+    def __init__(self, replay):
+        self.frames=replay.frames(); self.keys=KeyMask(); self.ticks=0
+    def read(self, dt):
+        frame = next(self.frames, None)
+        if frame is None:
+            return None, dt
+        self.keys.mask, dt = frame; self.ticks += 1
+        return self.keys, dt
+
+class SimClock:
+    # logic advances in fixed ticks fed by the frame time; after max_skip ticks in one frame the rest of the backlog is
+    # dropped so a slow machine loses frames instead of running in slow motion
+    def __init__(self, step=TICK_MS, max_skip=None):
+        self.step=step; self.max_skip=max_skip or MAX_FRAME_SKIP; self.acc=0; self.dropped=0; self.elapsed=0.0
+    def advance(self, game, frame_ms):
+        self.acc += frame_ms; ticks = 0
+        while self.acc >= self.step:
+            if ticks >= self.max_skip:
+                self.dropped += int(self.acc // self.step); self.acc %= self.step
+                break
+            self.elapsed += self.step
+            keys, dt = game.controls.read(round(self.elapsed) - round(self.elapsed - self.step))
+            if keys is None:
+                return "quit"
+            game.remember()
+            result = game.step(keys, dt); ticks += 1; self.acc -= self.step
+            if result:
+                self.acc = 0
+                return result
+        return None
+    def alpha(self):
+        return self.acc / self.step
+
+def lerp(a, b, t):
+    return b if a is None or t >= 1 else round(a + (b - a) * t)
+
+def lerp_rows(a, b, t):
+    # rows only line up while nothing spawned or died since the previous tick
+    if a is None or t >= 1 or len(a) != len(b):
+        return b
+    return (a + (b - a) * t).round().astype(b.dtype)
 
 def slice_sheet(path, frame_w, frame_h):
-    if not os.path.exists(path): return []
-    img = pygame.image.load(path).convert_alpha()
+    img = read_image(path)
+    if img is None: return []
+    img = img.convert_alpha()
     w,h = img.get_width(), img.get_height()
     cols = max(1, w // frame_w); rows = max(1, h // frame_h)
     frames=[]
@@ -241,6 +534,25 @@ def normalize_and_scale(frames, scale=2, pad_to=None):
     flipped=[pygame.transform.flip(f,True,False) for f in out]
     return out, flipped
 
+def pack_atlas(mode):
+    # atlas.py's output as packed by assetpack.py, which leaves stale atlases out
+    png, index = (pack_key(p) for p in atlas_files(ATLAS_DIR, mode))
+    if PACK is None or png not in PACK or index not in PACK:
+        return None
+    return atlas_frames(PACK.image(png).convert_alpha(), json.loads(PACK.data(index)))
+
+def load_mode_frames(mode, use_atlas=True):
+    atlas = (pack_atlas(mode) or load_atlas(mode, ASSETS_DIR, ATLAS_DIR)) if use_atlas else None
+    out = {}
+    for name, fn, fw, fh, scale, pad_to in SHEETS[mode]:
+        if atlas and name in atlas:
+            out[name] = atlas[name]
+        elif fw is None:
+            out[name] = ([load_image(mode, fn)] if exists(mode, fn) else [], [])
+        else:
+            out[name] = normalize_and_scale(slice_sheet(asset_path(mode, fn), fw, fh), scale=scale, pad_to=pad_to)
+    return out
+
 class PlayerKnight(pygame.sprite.Sprite):
     def __init__(self, x, y, idle, idle_f, walk, walk_f, jump, jump_f, attack, attack_f):
         super().__init__()
@@ -254,6 +566,9 @@ class PlayerKnight(pygame.sprite.Sprite):
         self.attacking=False; self.attack_timer=0
         self.anim_idx=0; self.anim_t=0; self.current=None
         self.health=5; self.hit_cool=0
+    def reset(self, x, y):
+        self.rect.midbottom=(x,y); self.vel_y=0; self.on_ground=True; self.facing_right=True
+        self.attacking=False; self.attack_timer=0; self.health=5; self.hit_cool=0
     def update(self, keys, dt):
         dx=0; moving=False
         if keys[pygame.K_LEFT]: dx=-5; moving=True; self.facing_right=False
@@ -261,9 +576,7 @@ class PlayerKnight(pygame.sprite.Sprite):
         if keys[pygame.K_SPACE] and self.on_ground: self.vel_y=-16; self.on_ground=False
         if keys[pygame.K_a] and self.attack_timer<=0:
             self.attacking=True; self.attack_timer=12
-            if SOUND_ENABLED and sfx_sword_swipe:
-                try: sfx_sword_swipe.play()
-                except: pass
+            AUDIO.trigger("sword_swipe")
         if self.attack_timer>0: self.attack_timer-=1
         else: self.attacking=False
         self.vel_y += 1
@@ -290,172 +603,378 @@ class PlayerKnight(pygame.sprite.Sprite):
             self.rect = self.image.get_rect(); self.rect.midbottom = mid
         if self.hit_cool>0: self.hit_cool-=1
 
-class EnemyKnight(pygame.sprite.Sprite):
-    def __init__(self, x, y, frames, frames_f, speed=2, hp=1):
-        super().__init__()
-        self.frames, self.frames_f = frames, frames_f
-        self.idx=0; self.anim_t=0; self.current=frames
-        self.image = frames[0] if frames else pygame.Surface((48,48))
-        self.rect = self.image.get_rect(midbottom=(x,y))
-        self.speed = speed; self.hp = hp; self.invul=0
-    def update(self, dt):
-        self.rect.x += self.speed
-        if self.rect.left < 100 or self.rect.right > WIDTH - 140: self.speed *= -1
-        frames = self.frames_f if self.speed<0 and self.frames_f else self.frames
-        if self.current is not frames:
-            self.current = frames; self.idx=0; self.anim_t=0
-        self.anim_t += dt
-        if self.anim_t > 80:
-            self.anim_t=0; self.idx = (self.idx+1) % (len(frames) or 1)
-        if frames:
-            mid = self.rect.midbottom
-            self.image = frames[self.idx]
-            self.rect = self.image.get_rect(); self.rect.midbottom = mid
-        if self.invul>0: self.invul -= 1
-    def hit(self):
-        if self.invul>0: return
-        self.hp -= 1; self.invul=10
-        if self.hp<=0: self.kill()
+# lo/hi bound the left edge so bouncing is two compares; safe_until is the tick an enemy can be hit again
+KNIGHT_ENEMY_FIELDS = {"speed": np.int32, "hp": np.int32, "safe_until": np.int64, "lo": np.int32, "hi": np.int32,
+                       "kind": np.int16, "flip": np.bool_, "idx": np.int32, "anim_t": np.int32}
+# rows pre-allocated per store; a wave bigger than this grows the store once and keeps the larger size
+POOL_SIZES = {"knight_enemies": 64, "bullets": 64, "space_enemies": 256}
+
+CHUNK_W = 512
+CHUNK_TOP = GROUND_Y - 160
+ACTIVE_MARGIN = 128
 
 class KnightLevel:
-    def __init__(self, name, bg_files, decor_list, enemy_specs):
+    def __init__(self, name, bg_files, decor_list, enemy_specs, spawns=None, width=WIDTH):
         self.name=name; self.bg_files=bg_files; self.decor_list=decor_list; self.enemy_specs=enemy_specs
+        self.width=width
+        if spawns is None:
+            spawns=[]; x=360
+            for typ,count in enemy_specs:
+                speed = 2 if typ=="snake" else (3 if typ=="hyena" else 1)
+                hp = 1 if typ!="mummy" else 3
+                spawns += [{"type":typ, "x":x + i*60, "speed":speed, "hp":hp} for i in range(count)]
+                x += 220
+        self.spawns=spawns
+    @classmethod
+    def from_spec(cls, spec):
+        return cls(spec["name"], spec["bg"], spec["decor"], spec["enemies"], spec["spawns"], spec.get("width", WIDTH))
     def load_bg(self):
-        for fn in self.bg_files:
-            if os.path.exists(asset_path("knight", fn)):
-                return load_image("knight", fn, (WIDTH, HEIGHT))
-        return None
+        return load_scaled("knight", self.bg_files, (WIDTH, HEIGHT))
+    def chunk_count(self):
+        return (self.width + CHUNK_W - 1) // CHUNK_W
+    def chunk_decor(self, i):
+        # chunk i shows one decor file, cycling through those that exist; a level narrower than its decor list skips the rest
+        decor = [d for d in self.decor_list if exists("knight", d)]
+        return decor[i % len(decor)] if decor else None
+    def prefetch(self):
+        if ("knight", tuple(self.bg_files), (WIDTH, HEIGHT)) not in ASSET_CACHE:
+            PREFETCH.request("knight", first_existing("knight", self.bg_files))
+        # only decor a chunk will draw: anything else would be decoded and then never taken from the prefetcher
+        for d in dict.fromkeys(self.chunk_decor(i) for i in range(min(self.chunk_count(), len(self.decor_list)))):
+            if d and ("knight", d, (96,128)) not in ASSET_CACHE:
+                PREFETCH.request("knight", d)
+    def preload(self):
+        self.load_bg(); ground_tiles(); castle_image()
+        for i in range(min(2, self.chunk_count())):
+            level_chunk(self, i)
+
+def ground_tiles():
+    top = load_scaled("knight", ["grass.png", "sand_tile.png", "spooky_ground.png"], (64,64), (34,139,34))
+    under = load_scaled("knight", ["ground.png", "sand_tile.png", "spooky_ground.png"], (64,64), (139,69,19))
+    return top, under
+
+def castle_image():
+    # with no castle.png in the pack or on disk the placeholder is drawn in memory; the asset tree is never written to
+    if not exists("knight", "castle.png"):
+        return ASSET_CACHE.get(("knight", "castle.png", (120,160)), lambda: castle_placeholder().convert_alpha())
+    return cached_image("knight", "castle.png", (120,160))
+
+def level_chunk(lvl, i):
+    # ground, decor and castle for one CHUNK_W slice of the world, built on first sight and evicted by the LRU
+    def build():
+        x0 = i * CHUNK_W
+        surf = pygame.Surface((CHUNK_W, HEIGHT - CHUNK_TOP), pygame.SRCALPHA).convert_alpha()
+        tile, g = ground_tiles()
+        for x in range(0, CHUNK_W, 64):
+            surf.blit(tile, (x, GROUND_Y - CHUNK_TOP))
+            surf.blit(g, (x, GROUND_Y + 64 - CHUNK_TOP))
+        decor = lvl.chunk_decor(i)
+        if decor:
+            rng = random.Random(f"{lvl.name}:{i}")
+            img = cached_image("knight", decor, (96,128))
+            surf.blit(img, (rng.randint(0, CHUNK_W - 96), GROUND_Y - 128 - CHUNK_TOP))
+        castle_x = lvl.width - 140
+        if x0 - 120 < castle_x < x0 + CHUNK_W:
+            surf.blit(castle_image(), (castle_x - x0, 0))
+        return surf
+    return ASSET_CACHE.get(("knight-chunk", lvl.name, tuple(lvl.decor_list), lvl.width, i), build)
+
+class Camera:
+    def __init__(self, world_w, view_w=WIDTH, lead=WIDTH // 3):
+        self.world_w=world_w; self.view_w=view_w; self.lead=lead; self.x=0
+    def follow(self, rect):
+        self.x = max(0, min(self.world_w - self.view_w, rect.centerx - self.lead))
+        return self.x
+    def view(self, margin=0):
+        return pygame.Rect(self.x - margin, 0, self.view_w + 2 * margin, HEIGHT)
+
+class LevelList:
+    def __init__(self, specs, build):
+        self.specs=specs; self.build=build; self.last=(None, None)
+    def __len__(self):
+        return len(self.specs)
+    def __getitem__(self, i):
+        if self.last[0] != i:
+            self.last = (i, self.build(self.specs[i]))
+        return self.last[1]
+    def prefetch(self, i):
+        if PREFETCH.enabled and 0 <= i < len(self.specs):
+            self.build(self.specs[i]).prefetch()
+
+def transition(before, after, title, ms):
+    # fade the finished level out and the next one in while still pumping events, instead of sleeping
+    label = FONT.render(title, True, (255,255,255)); shade = pygame.Surface((WIDTH, HEIGHT)).convert()
+    elapsed = 0; clock.tick()
+    while elapsed < ms:
+        for ev in pygame.event.get():
+            if ev.type == pygame.QUIT:
+                PROFILER.close(); PREFETCH.close(); pygame.quit(); sys.exit()
+        t = elapsed / ms
+        screen.blit(before if t < 0.5 else after, (0,0))
+        shade.set_alpha(int(255 * (1 - abs(2 * t - 1)))); screen.blit(shade, (0,0))
+        screen.blit(label, label.get_rect(center=(WIDTH // 2, HEIGHT // 2)))
+        pygame.display.flip()
+        elapsed += clock.tick(FPS)
 
 class KnightGame:
-    def __init__(self, story):
+    def __init__(self, story, campaign=None):
         self.story = story.lower()
-        idle_frames, idle_f = normalize_and_scale(slice_sheet(asset_path("knight","knight_idle.png"),100,80), scale=2, pad_to=(100,80))
-        walk_frames, walk_f = normalize_and_scale(slice_sheet(asset_path("knight","knight_walk.png"),100,80), scale=2, pad_to=(100,80))
-        jump_frames, jump_f = normalize_and_scale(slice_sheet(asset_path("knight","knight_jump.png"),30,80), scale=3, pad_to=(30,80))
-        attack_frames, attack_f = normalize_and_scale(slice_sheet(asset_path("knight","knight_attack.png"),40,80), scale=3, pad_to=(40,80))
-        if not idle_frames: idle_frames=[load_image("knight","knight_idle.png",(100,80))]
-        if not walk_frames: walk_frames=[load_image("knight","knight_walk.png",(100,80))]
-        if not jump_frames: jump_frames=[load_image("knight","knight_jump.png",(30,80))]
-        if not attack_frames: attack_frames=[load_image("knight","knight_attack.png",(40,80))]
-        idle_f = [pygame.transform.flip(f,True,False) for f in idle_frames]
-        walk_f = [pygame.transform.flip(f,True,False) for f in walk_frames]
-        jump_f = [pygame.transform.flip(f,True,False) for f in jump_frames]
-        attack_f = [pygame.transform.flip(f,True,False) for f in attack_frames]
+        frames = load_mode_frames("knight")
+        def player_frames(name, fn, size):
+            right, left = frames[name]
+            if not right:
+                right = [load_image("knight", fn, size)]; left = [pygame.transform.flip(f,True,False) for f in right]
+            return right, left
+        idle_frames, idle_f = player_frames("idle", "knight_idle.png", (100,80))
+        walk_frames, walk_f = player_frames("walk", "knight_walk.png", (100,80))
+        jump_frames, jump_f = player_frames("jump", "knight_jump.png", (30,80))
+        attack_frames, attack_f = player_frames("attack", "knight_attack.png", (40,80))
         self.player = PlayerKnight(120, GROUND_Y, idle_frames, idle_f, walk_frames, walk_f, jump_frames, jump_f, attack_frames, attack_f)
-        self.player_group = pygame.sprite.Group(self.player)
-        forest = KnightLevel("Forest", ["sky.png","pine.png","mountains.png"], ["tree.png","rock.png","bush.png"], [("snake",3),("hyena",1)])
-        desert = KnightLevel("Desert", ["desert_bg.png"], ["cactus.png","ruins.png"], [("hyena",3)])
-        grave = KnightLevel("Graveyard", ["graveyard_bg.png"], ["tombstone.png","dead_tree.png"], [("mummy",2)])
-        chosen=[]
-        if any(k in self.story for k in ["forest","woods","tree"]): chosen.append(forest)
-        if any(k in self.story for k in ["desert","sand","dune"]): chosen.append(desert)
-        if any(k in self.story for k in ["tomb","grave","mummy","crypt","graveyard"]): chosen.append(grave)
-        if not chosen: chosen=[forest, desert, grave]
-        self.levels = chosen
-        s_frames, s_frames_f = normalize_and_scale(slice_sheet(asset_path("knight","snake_walk.png"),16,48), scale=3)
-        h_frames, h_frames_f = normalize_and_scale(slice_sheet(asset_path("knight","hyena_walk.png"),24,48), scale=3)
-        m_frames, m_frames_f = normalize_and_scale(slice_sheet(asset_path("knight","mummy_walk.png"),24,48), scale=3)
+        self.player_group = pygame.sprite.RenderUpdates(self.player)
+        self.levels = LevelList(campaign if campaign is not None else make_campaign("knight", self.story), KnightLevel.from_spec)
+        s_frames, s_frames_f = frames["snake"]
+        h_frames, h_frames_f = frames["hyena"]
+        m_frames, m_frames_f = frames["mummy"]
         self.enemy_frames = {
             "snake": (s_frames or [load_image("knight","snake_walk.png",(32,48))], s_frames_f or []),
             "hyena": (h_frames or [load_image("knight","hyena_walk.png",(48,48))], h_frames_f or []),
             "mummy": (m_frames or [load_image("knight","mummy_walk.png",(48,48))], m_frames_f or [])
         }
-        self.current_index=0; self.enemy_group = pygame.sprite.Group(); self.debug=False
+        self.kind_index = {}; self.kind_images = []; self.ticks = 0
+        self.current_index=0; self.enemies = EntityStore(KNIGHT_ENEMY_FIELDS, POOL_SIZES["knight_enemies"]); self.debug=False
+        self.renderer = Renderer(screen); self.view_surf=None
+        self.controls = LiveControls(); self.fps = RENDER_FPS or FPS; self.kills = 0; self.prev = None
         self.spawn_current_level()
 
+    def enemy_kind(self, typ):
+        k = self.kind_index.get(typ)
+        if k is None:
+            k = self.kind_index[typ] = len(self.kind_images)
+            self.kind_images.append(self.enemy_frames.get(typ) or ([load_image("knight",f"{typ}_walk.png")], []))
+            self.has_flip = np.array([bool(ff) for _, ff in self.kind_images])
+            self.frame_counts = np.array([[len(f) or 1 for f, _ in self.kind_images], [len(ff) or 1 for _, ff in self.kind_images]])
+        return k
+
+    def add_enemy(self, typ, x, speed=2, hp=1, bounds=(100, WIDTH - 140)):
+        k = self.enemy_kind(typ)
+        w, h = self.kind_images[k][0][0].get_size()
+        self.enemies.add(x=x - w//2, y=GROUND_Y - h, w=w, h=h, speed=speed, hp=hp, lo=bounds[0], hi=bounds[1] - w, kind=k,
+                         flip=speed < 0 and self.has_flip[k])
+
     def spawn_current_level(self):
-        self.enemy_group.empty()
+        self.enemies.clear(); self.prev = None
         lvl = self.levels[self.current_index]
-        x = 360
-        for typ,count in lvl.enemy_specs:
-            frames, frames_f = self.enemy_frames.get(typ, ([load_image("knight",f"{typ}_walk.png")], []))
-            for i in range(count):
-                speed = 2 if typ=="snake" else (3 if typ=="hyena" else 1)
-                hp = 1 if typ!="mummy" else 3
-                e = EnemyKnight(x + i*60, GROUND_Y, frames, frames_f, speed=speed, hp=hp)
-                self.enemy_group.add(e)
-            x += 220
-        print(f"Spawned level '{self.levels[self.current_index].name}' -> enemies: {len(self.enemy_group)}")
+        self.enemies.reserve(len(lvl.spawns))
+        walls = (100, lvl.width - 140)
+        for sp in lvl.spawns:
+            self.add_enemy(sp["type"], sp["x"], sp["speed"], sp["hp"], sp.get("patrol", walls))
+        self.camera = Camera(lvl.width); self.camera.follow(self.player.rect); self.view_x = self.camera.x
+        lvl.preload(); self.static_layer(lvl)
+        self.levels.prefetch(self.current_index + 1)
+        log(f"Spawned level '{self.levels[self.current_index].name}' -> enemies: {len(self.enemies)}")
+
+    def reset(self):
+        self.current_index=0; self.kills=0
+        self.player.reset(120, GROUND_Y)
+        self.spawn_current_level()
 
-    def draw_background_and_ground(self, lvl):
+    def draw_background_and_ground(self, lvl, surface, cam_x=0):
         bg = lvl.load_bg()
         if bg:
-            screen.blit(pygame.transform.scale(bg,(WIDTH,HEIGHT)), (0,0))
+            surface.blit(bg, (0,0))
         else:
             if lvl.name.lower().startswith("desert"):
-                screen.fill((245, 222, 179))
+                surface.fill((245, 222, 179))
             elif lvl.name.lower().startswith("grave"):
-                screen.fill((45,45,60))
+                surface.fill((45,45,60))
             else:
-                screen.fill((120,180,240))
-        top_tile = None
-        for name in ["grass.png", "sand_tile.png", "spooky_ground.png"]:
-            if os.path.exists(asset_path("knight", name)):
-                top_tile = load_image("knight", name, (64,64)); break
-        if top_tile is None:
-            top_tile = pygame.Surface((64,64)); top_tile.fill((34,139,34))
-        under_tile = None
-        for name in ["ground.png", "sand_tile.png", "spooky_ground.png"]:
-            if os.path.exists(asset_path("knight", name)):
-                under_tile = load_image("knight", name, (64,64)); break
-        if under_tile is None:
-            under_tile = pygame.Surface((64,64)); under_tile.fill((139,69,19))
-        tile = pygame.transform.scale(top_tile,(64,64)); g = pygame.transform.scale(under_tile,(64,64))
-        for x in range(0, WIDTH, 64):
-            screen.blit(tile,(x,GROUND_Y))
-            screen.blit(g,(x,GROUND_Y+64))
-        castle = load_image("knight","castle.png",(120,160))
-        screen.blit(pygame.transform.scale(castle,(120,160)), (WIDTH-140, GROUND_Y-160))
+                surface.fill((120,180,240))
+        last = min(lvl.chunk_count(), (cam_x + WIDTH - 1) // CHUNK_W + 1)
+        for i in range(cam_x // CHUNK_W, last):
+            surface.blit(level_chunk(lvl, i), (i * CHUNK_W - cam_x, CHUNK_TOP))
+        if last < lvl.chunk_count():
+            level_chunk(lvl, last)
+
+    def static_layer(self, lvl):
+        def build():
+            surf = pygame.Surface((WIDTH, HEIGHT)).convert()
+            self.draw_background_and_ground(lvl, surf)
+            return surf
+        return ASSET_CACHE.get(("knight-static", lvl.name, tuple(lvl.bg_files), lvl.width), build)
+
+    def view_layer(self, lvl, cam_x):
+        if cam_x == 0:
+            return self.static_layer(lvl)
+        if self.view_surf is None:
+            self.view_surf = pygame.Surface((WIDTH, HEIGHT)).convert()
+        self.draw_background_and_ground(lvl, self.view_surf, cam_x)
+        return self.view_surf
+
+    def step(self, keys, dt):
+        lvl = self.levels[self.current_index]
+        self.update_sprites(keys, dt); PROFILER.lap("update")
+        result = self.collide(); PROFILER.lap("collide")
+        if result == "dead":
+            return "dead"
+        if self.player.rect.right >= lvl.width - 120 or len(self.enemies)==0:
+            AUDIO.trigger("level_complete")
+            log(f"Level '{lvl.name}' complete!")
+            return "complete"
+        return None
+
+    def update_sprites(self, keys, dt):
+        self.player_group.update(keys, dt)
+        self.camera.follow(self.player.rect)
+        e = self.enemies
+        if not e.n:
+            return
+        self.ticks += 1
+        if e.lists is not None:
+            return self.update_enemies_small(e.lists, dt)
+        x = e.x; speed = e.speed; idx = e.idx; anim_t = e.anim_t
+        x += speed
+        bounce = (x < e.lo) | (x > e.hi)
+        if np.count_nonzero(bounce):
+            speed[bounce] *= -1
+            turned = bounce & self.has_flip[e.kind]
+            e.flip[turned] = speed[turned] < 0; idx[turned] = 0; anim_t[turned] = 0
+        # walking and bouncing stay exact everywhere; on wide levels only enemies near the camera pay for animation
+        if self.camera.world_w > WIDTH:
+            active = self.camera.view(ACTIVE_MARGIN)
+            near = (x < active.right) & (x + e.w > active.left)
+            anim_t += near * dt
+            roll = near & (anim_t > 80)
+        else:
+            anim_t += dt
+            roll = anim_t > 80
+        if np.count_nonzero(roll):
+            anim_t[roll] = 0
+            idx[roll] = (idx[roll] + 1) % self.frame_counts[e.flip[roll].astype(np.intp), e.kind[roll]]
+
+    def update_enemies_small(self, c, dt):
+        # the same walk, bounce and animation as the array path, row by row over the store's lists
+        xs = c["x"]; ws = c["w"]; speed = c["speed"]; lo = c["lo"]; hi = c["hi"]; kind = c["kind"]; flip = c["flip"]
+        idx = c["idx"]; anim_t = c["anim_t"]; has_flip = self.has_flip.tolist(); counts = self.frame_counts.tolist()
+        left = right = None
+        if self.camera.world_w > WIDTH:
+            active = self.camera.view(ACTIVE_MARGIN); left = active.left; right = active.right
+        for i in range(len(xs)):
+            x = xs[i] = xs[i] + speed[i]
+            if x < lo[i] or x > hi[i]:
+                speed[i] = -speed[i]
+                if has_flip[kind[i]]:
+                    flip[i] = speed[i] < 0; idx[i] = 0; anim_t[i] = 0
+            if left is None or (x < right and x + ws[i] > left):
+                t = anim_t[i] + dt
+                if t > 80:
+                    t = 0; idx[i] = (idx[i] + 1) % counts[flip[i]][kind[i]]
+                anim_t[i] = t
+
+    def collide(self):
+        e = self.enemies
+        if e.lists is not None:
+            touching = e.touching(self.player.rect); hit = bool(touching)
+        else:
+            touching = e.overlaps(self.player.rect); hit = np.count_nonzero(touching)
+        if not hit:
+            return None
+        if self.player.attacking:
+            if e.lists is not None:
+                hp = e.lists["hp"]; safe = e.lists["safe_until"]; keep = [True] * e.n
+                for i in touching:
+                    if safe[i] <= self.ticks:
+                        hp[i] -= 1; safe[i] = self.ticks + 10; keep[i] = hp[i] > 0
+                self.kills += e.compact(keep)
+            else:
+                hp = e.hp
+                struck = touching & (e.safe_until <= self.ticks)
+                hp[struck] -= 1; e.safe_until[struck] = self.ticks + 10
+                self.kills += e.compact(~(struck & (hp <= 0)))
+            AUDIO.trigger("sword_hit")
+        elif self.player.hit_cool<=0:
+            self.player.health -= 1; self.player.hit_cool=40
+            if self.player.health<=0:
+                log("Player died. Game Over.")
+                return "dead"
+        return None
+
+    def pool_stats(self):
+        return {"enemies": self.enemies.stats()}
+
+    def telemetry(self, dt):
+        return {"dt": dt, "enemies": len(self.enemies), **cache_telemetry()}
+
+    def snapshot(self):
+        return {"level": self.current_index, "hp": self.player.health, "x": self.player.rect.x, "y": self.player.rect.y,
+                "enemies": len(self.enemies)}
+
+    def next_level(self):
+        self.current_index += 1
+        if self.current_index < len(self.levels):
+            log("Loading next Knight level...")
+            self.player.rect.midbottom = (120, GROUND_Y)
+            self.spawn_current_level()
+            return True
+        return False
+
+    def remember(self):
+        e = self.enemies
+        self.prev = (self.camera.x, self.player.rect.topleft, e.x.copy(), e.y.copy())
+
+    def draw(self, alpha=1.0):
+        lvl = self.levels[self.current_index]; prev = self.prev or (None, (None, None), None, None)
+        cam_x = lerp(prev[0], self.camera.x, alpha)
+        if cam_x != self.view_x:
+            self.view_x = cam_x
+            self.renderer.set_background(self.view_layer(lvl, cam_x))
+        self.renderer.begin()
+        e = self.enemies; ex = lerp_rows(prev[2], e.x, alpha); ey = lerp_rows(prev[3], e.y, alpha)
+        vis = np.flatnonzero((ex < cam_x + WIDTH) & (ex + e.w > cam_x))
+        imgs = self.kind_images
+        self.renderer.blits([(imgs[k][f][i], (x - cam_x, y)) for k, f, i, x, y in
+                             zip(e.kind[vis].tolist(), e.flip[vis].tolist(), e.idx[vis].tolist(), ex[vis].tolist(), ey[vis].tolist())])
+        rect = self.player.rect; at = rect.topleft
+        rect.topleft = (lerp(prev[1][0], at[0], alpha), lerp(prev[1][1], at[1], alpha))
+        self.renderer.draw(self.player_group, offset=cam_x)
+        rect.topleft = at
+        if self.debug:
+            self.renderer.mark(pygame.draw.rect(screen,(255,0,0), self.player.rect.move(-cam_x,0),2))
+            for r in e.rects():
+                self.renderer.mark(pygame.draw.rect(screen,(255,255,0), pygame.Rect(r).move(-cam_x,0),2))
+        hud = FONT.render(f"{lvl.name}  HP:{self.player.health}  Level {self.current_index+1}/{len(self.levels)} (D toggle)", True, (255,255,255))
+        self.renderer.mark(screen.blit(hud,(8,8)))
+        draw_overlay(self.renderer); PROFILER.lap("draw")
+        self.renderer.present(); PROFILER.lap("flip")
 
     def run(self):
+        self.sim = SimClock()
         while self.current_index < len(self.levels):
-            lvl = self.levels[self.current_index]
-            level_complete=False
-            while not level_complete:
-                dt = clock.tick(FPS)
+            self.renderer.set_background(self.view_layer(self.levels[self.current_index], self.view_x))
+            while True:
+                # uncapped playback runs exactly one tick per drawn frame
+                frame_ms = clock.tick(self.fps) if self.fps else TICK_MS; PROFILER.begin()
                 for ev in pygame.event.get():
                     if ev.type == pygame.QUIT:
-                        pygame.quit(); sys.exit()
+                        PROFILER.close(); PREFETCH.close(); pygame.quit(); sys.exit()
                     if ev.type == pygame.KEYDOWN and ev.key==pygame.K_d:
                         self.debug = not self.debug
-                keys = pygame.key.get_pressed()
-                self.player_group.update(keys, dt)
-                self.enemy_group.update(dt)
-                for e in list(self.enemy_group):
-                    if self.player.rect.colliderect(e.rect):
-                        if self.player.attacking:
-                            e.hit()
-                            if SOUND_ENABLED and sfx_sword_hit:
-                                try: sfx_sword_hit.play()
-                                except: pass
-                        else:
-                            if self.player.hit_cool<=0:
-                                self.player.health -= 1; self.player.hit_cool=40
-                                if self.player.health<=0:
-                                    print("Player died. Game Over.")
-                                    return False
-                if self.player.rect.right >= WIDTH - 120 or len(self.enemy_group)==0:
-                    if SOUND_ENABLED and sfx_level_complete:
-                        try: sfx_level_complete.play()
-                        except: pass
-                    print(f"Level '{lvl.name}' complete!")
-                    level_complete=True
-                self.draw_background_and_ground(lvl)
-                self.enemy_group.draw(screen)
-                self.player_group.draw(screen)
-                if self.debug:
-                    pygame.draw.rect(screen,(255,0,0), self.player.rect,2)
-                    for e in self.enemy_group:
-                        pygame.draw.rect(screen,(255,255,0), e.rect,2)
-                hud = FONT.render(f"{lvl.name}  HP:{self.player.health}  Level {self.current_index+1}/{len(self.levels)} (D toggle)", True, (255,255,255))
-                screen.blit(hud,(8,8))
-                pygame.display.flip()
-            self.current_index += 1
-            if self.current_index < len(self.levels):
-                print("Loading next Knight level...")
-                self.player.rect.midbottom = (120, GROUND_Y)
-                self.spawn_current_level()
-                time.sleep(0.5)
+                    elif ev.type == pygame.KEYDOWN:
+                        profiler_key(ev.key)
+                PROFILER.lap("event")
+                result = self.sim.advance(self, frame_ms)
+                if result == "dead":
+                    return False
+                if result == "quit":
+                    return None
+                self.draw(self.sim.alpha()); AUDIO.flush()
+                if PROFILER.enabled:
+                    PROFILER.end_frame(self.telemetry(frame_ms))
+                if result == "complete":
+                    break
+            before = screen.copy()
+            if self.next_level() and self.fps:
+                lvl = self.levels[self.current_index]
+                transition(before, self.view_layer(lvl, self.view_x), lvl.name, 500)
         print("Knight campaign complete!")
         return True
 
@@ -464,6 +983,8 @@ class PlayerShip(pygame.sprite.Sprite):
         super().__init__()
         self.image=img; self.rect=self.image.get_rect(center=(x,y))
         self.speed=speed; self.hp=hp; self.cool=0
+    def reset(self, x, y, hp=5):
+        self.rect.center=(x,y); self.hp=hp; self.cool=0
     def update(self, keys):
         dx=dy=0
         if keys[pygame.K_LEFT]: dx-=self.speed
@@ -476,152 +997,391 @@ class PlayerShip(pygame.sprite.Sprite):
         if self.cool>0: self.cool-=1
     def shoot(self, bullets, bullet_img):
         if self.cool<=0:
-            bullets.add(Bullet(bullet_img, self.rect.centerx, self.rect.top-10, -10))
+            bullets.add(vy=-10, **centered(bullet_img, self.rect.centerx, self.rect.top-10))
             self.cool=12
-            if SOUND_ENABLED and sfx_laser:
-                try: sfx_laser.play()
-                except: pass
+            AUDIO.trigger("laser")
 
-class Bullet(pygame.sprite.Sprite):
-    def __init__(self, img, x, y, vy):
-        super().__init__()
-        self.image=img; self.rect=self.image.get_rect(center=(x,y)); self.vy=vy
-    def update(self):
-        self.rect.y += self.vy
-        if self.rect.bottom<0 or self.rect.top>HEIGHT: self.kill()
+def centered(img, x, y):
+    w, h = img.get_size()
+    return {"x": x - w//2, "y": y - h//2, "w": w, "h": h}
 
-class SpaceEnemy(pygame.sprite.Sprite):
-    def __init__(self, img, x, y, speed=2, hp=1, pattern="straight"):
-        super().__init__()
-        self.image=img; self.rect=self.image.get_rect(center=(x,y))
-        self.speed=speed; self.hp=hp; self.pattern=pattern; self.t=0
-    def update(self):
-        self.t+=1
-        if self.pattern=="zig":
-            self.rect.x += int(self.speed * (1 if (self.t//20)%2==0 else -1))
-            self.rect.y += max(1, self.speed//2)
-        else:
-            self.rect.y += self.speed
-        if self.rect.top > HEIGHT: self.kill()
-    def hit(self):
-        self.hp -= 1
-        if self.hp <= 0: self.kill()
+BULLET_FIELDS = {"vy": np.int32}
+SPACE_ENEMY_FIELDS = {"speed": np.int32, "hp": np.int32, "pattern": np.int8, "t": np.int32, "kind": np.int16,
+                      "dx": np.int32, "dy": np.int32}
+PATTERNS = {"straight": 0, "zig": 1}
+SCREEN_RECT = pygame.Rect(0, 0, WIDTH, HEIGHT)
 
 class SpaceMission:
     def __init__(self, name, waves, bg_list):
         self.name=name; self.waves=waves; self.bg_list=bg_list
     def load_bg(self):
-        for fn in self.bg_list:
-            if os.path.exists(asset_path("space", fn)):
-                return load_image("space", fn, (WIDTH, HEIGHT))
-        return None
+        return load_scaled("space", self.bg_list, (WIDTH, HEIGHT))
+    def prefetch(self):
+        if ("space", tuple(self.bg_list), (WIDTH, HEIGHT)) not in ASSET_CACHE:
+            PREFETCH.request("space", first_existing("space", self.bg_list))
+    @classmethod
+    def from_spec(cls, spec):
+        return cls(spec["name"], spec["waves"], spec["bg"])
 
 class SpaceGame:
-    def __init__(self, story):
+    def __init__(self, story, campaign=None):
         self.story = story.lower()
-        self.bg_default = load_image("space","space_bg.png",(WIDTH,HEIGHT))
-        self.player_img = load_image("space","player_ship.png",(48,48))
-        self.bullet_img = load_image("space","bullet.png",(6,12))
+        self.bg_default = cached_image("space","space_bg.png",(WIDTH,HEIGHT))
+        frames = load_mode_frames("space")
+        def image(name, fn, size):
+            return frames[name][0][0] if frames[name][0] else load_image("space", fn, size)
+        self.player_img = image("player","player_ship.png",(48,48))
+        self.bullet_img = image("bullet","bullet.png",(6,12))
         self.enemy_imgs = {
-            "alien": load_image("space","enemy_alien.png",(32,32)),
-            "drone": load_image("space","enemy_drone.png",(36,36)),
-            "boss": load_image("space","enemy_boss.png",(96,96))
+            "alien": image("alien","enemy_alien.png",(32,32)),
+            "drone": image("drone","enemy_drone.png",(36,36)),
+            "boss": image("boss","enemy_boss.png",(96,96))
         }
+        self.kind_names = list(self.enemy_imgs); self.kind_imgs = list(self.enemy_imgs.values())
         self.player = PlayerShip(self.player_img, WIDTH//2, HEIGHT-80, speed=6, hp=5)
-        self.player_group = pygame.sprite.Group(self.player)
-        self.bullets = pygame.sprite.Group()
-        self.enemies = pygame.sprite.Group()
-        m1 = SpaceMission("Outer Orbit", [{"type":"alien","count":6,"speed":2,"hp":1,"pattern":"straight"}], ["space_bg.png","nebula_bg.png"])
-        m2 = SpaceMission("Asteroid Belt", [{"type":"drone","count":5,"speed":3,"hp":2,"pattern":"zig"},{"type":"alien","count":4,"speed":2,"hp":1}], ["asteroid_bg.png","space_bg.png"])
-        m3 = SpaceMission("Deep Space", [{"type":"boss","count":1,"speed":1,"hp":10,"pattern":"straight"}], ["nebula_bg.png","space_bg.png"])
-        self.missions = [m1, m2, m3]
- 
+        self.player_group = pygame.sprite.RenderUpdates(self.player)
+        self.bullets = EntityStore(BULLET_FIELDS, POOL_SIZES["bullets"])
+        self.enemies = EntityStore(SPACE_ENEMY_FIELDS, POOL_SIZES["space_enemies"])
+        self.missions = LevelList(campaign if campaign is not None else make_campaign("space", self.story), SpaceMission.from_spec)
         self.current_idx=0; self.debug=False
+        self.renderer = Renderer(screen)
+        self.controls = LiveControls(); self.fps = RENDER_FPS or FPS; self.prev = None
+        self.rng = random; self.kills = 0
+        self.start_mission()
+
+    def reset(self):
+        self.current_idx=0; self.kills=0
+        self.player.reset(WIDTH//2, HEIGHT-80)
+        self.start_mission()
+
+    def start_mission(self):
+        self.enemies.clear(); self.bullets.clear(); self.prev = None
+        self.enemies.reserve(sum(w.get("count",5) for w in self.missions[self.current_idx].waves))
+        self.player.rect.center = (WIDTH//2, HEIGHT-80)
+        self.wave_idx=0; self.wave_timer=30
+        self.missions.prefetch(self.current_idx + 1)
+
+    def static_layer(self, mission):
+        bg = mission.load_bg() or self.bg_default
+        return ASSET_CACHE.get(("space-static", tuple(mission.bg_list)), lambda: bg.convert())
+
+    def add_enemy(self, t, x, y, speed=2, hp=1, pattern="straight", count=1):
+        kind = self.kind_names.index(t) if t in self.enemy_imgs else 0
+        zig = pattern == "zig"
+        # per-tick steps are fixed at spawn: zig-zaggers sway by speed and sink at half speed, the rest fall straight
+        dx, dy = (speed, max(1, speed//2)) if zig else (0, speed)
+        self.enemies.extend(count, speed=speed, hp=hp, pattern=PATTERNS.get(pattern, 0), kind=kind, dx=dx, dy=dy,
+                            **centered(self.kind_imgs[kind], x, y))
 
     def spawn_wave(self, wave):
-        t = wave.get("type","alien"); count=wave.get("count",5)
+        count = wave.get("count",5); xs = []; ys = []
         for i in range(count):
-            x = random.randint(40, WIDTH-40); y = -random.randint(20,300) - i*40
-            img = self.enemy_imgs.get(t, self.enemy_imgs["alien"])
-            self.enemies.add(SpaceEnemy(img,x,y,speed=wave.get("speed",2),hp=wave.get("hp",1),pattern=wave.get("pattern","straight")))
+            xs.append(self.rng.randint(40, WIDTH-40)); ys.append(-self.rng.randint(20,300) - i*40)
+        self.add_enemy(wave.get("type","alien"), np.array(xs), np.array(ys), wave.get("speed",2), wave.get("hp",1),
+                       wave.get("pattern","straight"), count)
+
+    def step(self, keys, dt=FIXED_DT):
+        mission = self.missions[self.current_idx]
+        if keys[pygame.K_SPACE]:
+            self.player.shoot(self.bullets, self.bullet_img)
+        if self.wave_idx < len(mission.waves):
+            if self.wave_timer <= 0:
+                self.spawn_wave(mission.waves[self.wave_idx])
+                self.wave_timer = 400
+                self.wave_idx += 1
+            else:
+                self.wave_timer -= 1
+        self.update_sprites(keys, dt); PROFILER.lap("update")
+        result = self.collide(); PROFILER.lap("collide")
+        if result == "dead":
+            return "dead"
+        self.player.tick()
+        if self.wave_idx >= len(mission.waves) and len(self.enemies) == 0:
+            log(f"Mission '{mission.name}' complete.")
+            return "complete"
+        return None
+
+    def update_sprites(self, keys, dt=FIXED_DT):
+        self.player_group.update(keys)
+        b = self.bullets
+        if b.lists is not None:
+            ys = b.lists["y"]; hs = b.lists["h"]; vy = b.lists["vy"]; gone = False
+            for i in range(len(ys)):
+                y = ys[i] = ys[i] + vy[i]
+                gone = gone or y + hs[i] < 0 or y > HEIGHT
+            if gone: b.compact([y + h >= 0 and y <= HEIGHT for y, h in zip(ys, hs)])
+        elif b.n:
+            y = b.y; y += b.vy
+            gone = (y + b.h < 0) | (y > HEIGHT)
+            if np.count_nonzero(gone): b.compact(~gone)
+        e = self.enemies
+        if e.lists is not None:
+            c = e.lists; xs = c["x"]; ys = c["y"]; ts = c["t"]; dx = c["dx"]; dy = c["dy"]; gone = False
+            for i in range(len(ys)):
+                t = ts[i] = ts[i] + 1
+                xs[i] += -dx[i] if (t // 20) & 1 else dx[i]
+                y = ys[i] = ys[i] + dy[i]
+                gone = gone or y > HEIGHT
+            if gone: e.compact([y <= HEIGHT for y in ys])
+        elif e.n:
+            t = e.t; x = e.x; y = e.y
+            t += 1
+            x += e.dx * (1 - 2 * ((t // 20) & 1))
+            y += e.dy
+            gone = y > HEIGHT
+            if np.count_nonzero(gone): e.compact(~gone)
+
+    def collide(self):
+        e = self.enemies; hp = e.lists["hp"] if e.lists is not None else e.hp
+        spent = []; killed = set()
+        # bullets resolve in firing order against the earliest-spawned enemy still standing, as the sprite groups did
+        for i, cands in self.bullets.hits(e):
+            for j in cands:
+                if j not in killed:
+                    hp[j] -= 1; spent.append(i)
+                    if hp[j] <= 0: killed.add(j)
+                    break
+        self.kills += len(killed)
+        if spent:
+            keep = [True] * len(self.bullets)
+            for i in spent: keep[i] = False
+            self.bullets.compact(keep)
+            AUDIO.trigger("explosion")
+        if e.lists is not None:
+            touching = [j for j in e.touching(self.player.rect) if j not in killed]; hits = len(touching)
+            killed.update(touching)
+            if killed: e.compact([j not in killed for j in range(e.n)])
+        else:
+            dead = np.zeros(e.n, bool); dead[list(killed)] = True
+            touching = e.overlaps(self.player.rect) & ~dead
+            hits = int(np.count_nonzero(touching)); dead |= touching
+            if np.count_nonzero(dead): e.compact(~dead)
+        if hits:
+            self.player.hp -= hits
+            AUDIO.trigger("ship_hit")
+        if hits and self.player.hp <= 0:
+            log("Player died. Game Over.")
+            return "dead"
+        return None
+
+    def pool_stats(self):
+        return {"enemies": self.enemies.stats(), "bullets": self.bullets.stats()}
+
+    def telemetry(self, dt):
+        return {"dt": dt, "enemies": len(self.enemies), "bullets": len(self.bullets), **cache_telemetry()}
+
+    def snapshot(self):
+        return {"level": self.current_idx, "hp": self.player.hp, "x": self.player.rect.x, "y": self.player.rect.y,
+                "enemies": len(self.enemies), "bullets": len(self.bullets)}
+
+    def next_level(self):
+        self.current_idx += 1
+        if self.current_idx < len(self.missions):
+            self.start_mission()
+            return True
+        return False
+
+    def remember(self):
+        e = self.enemies; b = self.bullets
+        self.prev = (self.player.rect.topleft, e.x.copy(), e.y.copy(), b.x.copy(), b.y.copy())
+
+    def draw(self, alpha=1.0):
+        mission = self.missions[self.current_idx]; prev = self.prev or ((None, None), None, None, None, None)
+        self.renderer.begin()
+        e = self.enemies; b = self.bullets
+        ex = lerp_rows(prev[1], e.x, alpha); ey = lerp_rows(prev[2], e.y, alpha)
+        vis = np.flatnonzero((ex < WIDTH) & (ex + e.w > 0) & (ey < HEIGHT) & (ey + e.h > 0)); imgs = self.kind_imgs
+        self.renderer.blits([(imgs[k], (x, y)) for k, x, y in zip(e.kind[vis].tolist(), ex[vis].tolist(), ey[vis].tolist())])
+        img = self.bullet_img
+        self.renderer.blits([(img, (x, y)) for x, y in zip(lerp_rows(prev[3], b.x, alpha).tolist(), lerp_rows(prev[4], b.y, alpha).tolist())])
+        rect = self.player.rect; at = rect.topleft
+        rect.topleft = (lerp(prev[0][0], at[0], alpha), lerp(prev[0][1], at[1], alpha))
+        self.renderer.draw(self.player_group)
+        rect.topleft = at
+        if self.debug:
+            self.renderer.mark(pygame.draw.rect(screen,(255,0,0), self.player.rect,2))
+        hud = FONT.render(f"{mission.name}  HP:{self.player.hp}  Mission {self.current_idx+1}/{len(self.missions)} (D toggle)", True, (255,255,255))
+        self.renderer.mark(screen.blit(hud,(8,8)))
+        draw_overlay(self.renderer); PROFILER.lap("draw")
+        self.renderer.present(); PROFILER.lap("flip")
 
     def run(self):
+        self.sim = SimClock()
         while self.current_idx < len(self.missions):
-            mission = self.missions[self.current_idx]
-            mission_complete=False
-            bg = mission.load_bg() or self.bg_default
-            self.enemies.empty(); self.bullets.empty()
-            self.player.rect.center = (WIDTH//2, HEIGHT-80)
-            wave_idx=0; wave_timer=30
-            while not mission_complete:
-                dt = clock.tick(FPS)
-                events = pygame.event.get()
-                for ev in events:
+            self.renderer.set_background(self.static_layer(self.missions[self.current_idx]))
+            while True:
+                # uncapped playback runs exactly one tick per drawn frame
+                frame_ms = clock.tick(self.fps) if self.fps else TICK_MS; PROFILER.begin()
+                for ev in pygame.event.get():
                     if ev.type == pygame.QUIT:
-                        pygame.quit(); sys.exit()
+                        PROFILER.close(); PREFETCH.close(); pygame.quit(); sys.exit()
                     if ev.type == pygame.KEYDOWN and ev.key==pygame.K_d:
                         self.debug = not self.debug
-                keys = pygame.key.get_pressed()
-                if keys[pygame.K_SPACE]:
-                    self.player.shoot(self.bullets, self.bullet_img)
-                if wave_idx < len(mission.waves):
-                    if wave_timer <= 0:
-                        self.spawn_wave(mission.waves[wave_idx])
-                        wave_timer = 400
-                        wave_idx += 1
-                    else:
-                        wave_timer -= 1
-                self.player_group.update(keys)
-                self.bullets.update()
-                self.enemies.update()
-                for b in list(self.bullets):
-                    hit = pygame.sprite.spritecollideany(b, self.enemies)
-                    if hit:
-                        try: hit.hit()
-                        except: hit.kill()
-                        b.kill()
-                        if SOUND_ENABLED and sfx_explosion:
-                            try: sfx_explosion.play()
-                            except: pass
-                if pygame.sprite.spritecollideany(self.player, self.enemies):
-                    for e in pygame.sprite.spritecollide(self.player, self.enemies, True):
-                        self.player.hp -= 1
-                        if SOUND_ENABLED and sfx_ship_hit:
-                            try: sfx_ship_hit.play()
-                            except: pass
-                    if self.player.hp <= 0:
-                        print("Player died. Game Over.")
-                        return False
-                self.player.tick()
-                if wave_idx >= len(mission.waves) and len(self.enemies) == 0:
-                    mission_complete = True
-                screen.blit(pygame.transform.scale(bg,(WIDTH,HEIGHT)),(0,0))
-                self.enemies.draw(screen)
-                self.bullets.draw(screen)
-                self.player_group.draw(screen)
-                if self.debug:
-                    pygame.draw.rect(screen,(255,0,0), self.player.rect,2)
-                hud = FONT.render(f"{mission.name}  HP:{self.player.hp}  Mission {self.current_idx+1}/{len(self.missions)} (D toggle)", True, (255,255,255))
-                screen.blit(hud,(8,8))
-                pygame.display.flip()
-            print(f"Mission '{mission.name}' complete.")
-            self.current_idx += 1
-            time.sleep(0.4)
+                    elif ev.type == pygame.KEYDOWN:
+                        profiler_key(ev.key)
+                PROFILER.lap("event")
+                result = self.sim.advance(self, frame_ms)
+                if result == "dead":
+                    return False
+                if result == "quit":
+                    return None
+                self.draw(self.sim.alpha()); AUDIO.flush()
+                if PROFILER.enabled:
+                    PROFILER.end_frame(self.telemetry(frame_ms))
+                if result == "complete":
+                    break
+            before = screen.copy()
+            if self.next_level() and self.fps:
+                mission = self.missions[self.current_idx]
+                transition(before, self.static_layer(mission), mission.name, 400)
         print("All space missions complete!")
         return True
 
-def run_flow():
-    global chosen_mode
-    if chosen_mode == "knight":
+def simulate(game, inputs, max_ticks=20000, dt=FIXED_DT):
+    ticks = 0; prof = PROFILER
+    while ticks < max_ticks:
+        if prof.enabled:
+            prof.begin(); result = game.step(inputs.next(), dt)
+            prof.end_frame(game.telemetry(dt))
+        else:
+            result = game.step(inputs.next(), dt)
+        ticks += 1
+        if result == "dead":
+            return "dead", ticks
+        if result == "complete" and not game.next_level():
+            return "win", ticks
+    return "timeout", ticks
+
+def settle_heap():
+    # modules, models and surfaces loaded so far live for the whole session; freezing them keeps full collections short
+    gc.collect(); gc.freeze()
+
+def gc_collections():
+    return sum(g["collections"] for g in gc.get_stats())
+
+def run_headless(mode, story, runs, seed=0, inputs="random", max_ticks=20000, campaign=None):
+    game = KnightGame(story, campaign) if mode == "knight" else SpaceGame(story, campaign)
+    outcomes = {"win": 0, "dead": 0, "timeout": 0}; total_ticks = 0
+    settle_heap(); collections = gc_collections()
+    t0 = time.perf_counter()
+    for r in range(runs):
+        random.seed(seed + r)
+        game.reset()
+        outcome, ticks = simulate(game, make_inputs(inputs, random.Random(seed + r)), max_ticks)
+        outcomes[outcome] += 1; total_ticks += ticks
+    elapsed = time.perf_counter() - t0
+    summary = {"mode": mode, "runs": runs, "seed": seed, "inputs": inputs, **outcomes,
+               "ticks": total_ticks, "seconds": round(elapsed, 3),
+               "runs_per_sec": round(runs / elapsed, 1) if elapsed else None,
+               "ticks_per_sec": round(total_ticks / elapsed) if elapsed else None,
+               "gc_collections": gc_collections() - collections, "pools": game.pool_stats()}
+    print(json.dumps(summary))
+    return summary
+
+OUTCOMES = {True: "win", False: "dead", None: "quit"}
+
+def run_flow(mode, story, campaign=None, recorder=None):
+    init_audio(mode)
+    if recorder:
+        random.seed(recorder.header["seed"])
+    if mode == "knight":
         print("Starting Knight campaign...")
-        kg = KnightGame(story)
-        kg.run()
+        game = KnightGame(story, campaign)
     else:
         print("Starting Space campaign...")
-        sg = SpaceGame(story)
-        sg.run()
+        game = SpaceGame(story, campaign)
+    game.controls = LiveControls(recorder)
+    settle_heap()
+    outcome = "quit"
+    try:
+        outcome = OUTCOMES[game.run()]
+    finally:
+        if recorder:
+            recorder.close(outcome=outcome, ticks=recorder.ticks, **game.snapshot())
+        if AUDIO.enabled:
+            log("Audio:", json.dumps(AUDIO.stats()))
 
-if __name__ == "__main__":
-    run_flow()
+def replay_headless(game, replay):
+    ticks = 0; keys = KeyMask()
+    for keys.mask, dt in replay.frames():
+        result = game.step(keys, dt); ticks += 1
+        if result == "dead":
+            return "dead", ticks
+        if result == "complete" and not game.next_level():
+            return "win", ticks
+    return "quit", ticks
+
+def play_replay(replay, speed):
+    h = replay.header
+    campaign = None
+    if h["levels"] or h["spec"] or h.get("timeline"):
+        if h.get("generator", GENERATOR_VERSION) != GENERATOR_VERSION:
+            print(f"Warning: replay recorded with level generator v{h['generator']}, regenerating with v{GENERATOR_VERSION}; "
+                  "its levels may differ")
+        campaign = make_campaign(h["mode"], h["story"], h["levels"], h["level_seed"], h["spec"], h["labels"], h.get("timeline"))
+    random.seed(h["seed"])
+    game = KnightGame(h["story"], campaign) if h["mode"] == "knight" else SpaceGame(h["story"], campaign)
+    settle_heap()
+    t0 = time.perf_counter()
+    if speed == "headless":
+        outcome, ticks = replay_headless(game, replay)
+    else:
+        game.controls = ReplayControls(replay); game.fps = FPS if speed == "realtime" else 0
+        outcome = OUTCOMES[game.run()]; ticks = game.controls.ticks
+    elapsed = time.perf_counter() - t0
+    got = {"outcome": outcome, "ticks": ticks, **game.snapshot()}
+    expected = h.get("final", {})
+    summary = {"replay": h["mode"], "playback": speed, **got, "seconds": round(elapsed, 3),
+               "ticks_per_sec": round(ticks / elapsed) if elapsed else None,
+               "match": all(got.get(k) == v for k, v in expected.items()), "expected": expected}
+    print(json.dumps(summary))
+    return summary
+
+def main(argv=None):
+    global HEADLESS, VERBOSE, FULL_FLIP, RENDER_FPS, MAX_FRAME_SKIP
+    args = parse_args(argv)
+    HEADLESS = HEADLESS or args.headless
+    VERBOSE = args.verbose or not HEADLESS
+    FULL_FLIP = FULL_FLIP or args.full_flip
+    RENDER_FPS = max(1, args.render_fps); MAX_FRAME_SKIP = max(1, args.max_frame_skip)
+    PROFILER.configure(args.trace, args.overlay and not HEADLESS, args.profile_dir)
+    if args.replay:
+        replay = Replay.load(args.replay)
+        speed = "headless" if HEADLESS else args.playback
+        HEADLESS = speed == "headless"; VERBOSE = args.verbose or not HEADLESS
+        PREFETCH.enabled = not HEADLESS
+        init_display()
+        summary = play_replay(replay, speed)
+        PROFILER.close(); PREFETCH.close()
+        pygame.quit()
+        sys.exit(0 if summary["match"] else 1)
+    PREFETCH.enabled = not HEADLESS
+    story = read_story(args)
+    campaign = labels = timeline = tl = None
+    spec = load_spec(args.spec) if args.spec else None
+    # a long story is split and classified once; mode, labels and the campaign all read the same timeline
+    if long_story(story) and args.mode != "space" and not keyword_override_space(story.lower()):
+        tl = story_timeline(story, spec=spec)
+    mode = args.mode or choose_mode(story, tl)
+    if mode == "knight" and tl:
+        timeline = tl["segments"]
+    if args.levels or args.spec or timeline:
+        labels = story_labels(story, use_model=args.levels is not None, timeline=tl)
+        campaign = make_campaign(mode, story, args.levels, args.level_seed, spec, labels, timeline)
+    init_display()
+    if HEADLESS:
+        run_headless(mode, story, args.runs, args.seed or 0, args.inputs, args.max_ticks, campaign)
+    else:
+        recorder = None
+        if args.record:
+            seed = args.seed if args.seed is not None else random.SystemRandom().getrandbits(32)
+            recorder = Recorder(args.record, {"mode": mode, "story": story, "seed": seed, "levels": args.levels,
+                                              "level_seed": args.level_seed, "spec": spec, "labels": labels, "timeline": timeline,
+                                              "generator": GENERATOR_VERSION})
+        run_flow(mode, story, campaign, recorder)
+    PROFILER.close(); PREFETCH.close()
     pygame.quit()
     print("Exited.")
+
+if __name__ == "__main__":
+    main()
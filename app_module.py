@@ -0,0 +1,22 @@
+import os, sys, importlib.util
+
+APP_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app(Vs code).py")
+MODULE_NAME = "storytogame_app"
+
+def load_app(headless=True):
+    if MODULE_NAME in sys.modules:
+        return sys.modules[MODULE_NAME]
+    if headless:
+        os.environ["STORYTOGAME_HEADLESS"] = "1"
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    spec = importlib.util.spec_from_file_location(MODULE_NAME, APP_FILE)
+    mod = importlib.util.module_from_spec(spec)
+    sys.modules[MODULE_NAME] = mod
+    try:
+        spec.loader.exec_module(mod)
+    except BaseException:
+        del sys.modules[MODULE_NAME]
+        raise
+    mod.init_display()
+    return mod
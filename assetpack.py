@@ -0,0 +1,161 @@
+import os, sys, json, mmap, struct, argparse
+import pygame
+from atlas import SHEETS, atlas_files, is_fresh
+
+PACK_PATH = os.environ.get("STORYTOGAME_ASSET_PACK", "assets.pack")
+MAGIC = b"STGA"
+VERSION = 1
+ALIGN = 64
+IMAGE_EXT = (".png", ".jpg", ".jpeg", ".bmp", ".gif")
+SOUND_EXT = (".wav", ".ogg")
+
+# file layout: MAGIC, version byte, u32 index length, JSON index, then each entry's buffer at its own ALIGN-ed offset.
+# Images are stored as raw RGBA rows, sounds as PCM in the mixer format recorded in the index, anything else as-is.
+class AssetPack:
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        try:
+            self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self.file.close(); raise
+        if self.mm[:4] != MAGIC or self.mm[4] != VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a version {VERSION} StoryToGame asset pack")
+        (n,) = struct.unpack_from("<I", self.mm, 5)
+        index = json.loads(self.mm[9:9 + n].decode("utf-8"))
+        self.entries = index["entries"]; self.sources = index.get("sources", {})
+        self.audio_format = tuple(index["audio"]) if index.get("audio") else None
+
+    @classmethod
+    def open(cls, path=PACK_PATH):
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            return cls(path)
+        except Exception as e:
+            print("Asset pack unavailable, using loose files:", e)
+            return None
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def view(self, key):
+        e = self.entries[key]
+        return memoryview(self.mm)[e["offset"]:e["offset"] + e["size"]]
+
+    def image(self, key):
+        # the surface reads its pixels straight out of the mapping; convert() makes the one copy the display needs
+        e = self.entries[key]
+        return pygame.image.frombuffer(self.view(key), tuple(e["wh"]), "RGBA")
+
+    def sound(self, key):
+        return pygame.mixer.Sound(buffer=self.view(key))
+
+    def data(self, key):
+        return bytes(self.view(key))
+
+    def close(self):
+        try:
+            self.mm.close()
+        except BufferError:
+            pass   # surfaces built from the pack still reference it; the mapping goes when they do
+        self.file.close()
+
+def iter_files(assets_dir):
+    for root, dirs, files in os.walk(assets_dir):
+        dirs.sort()
+        for fn in sorted(files):
+            path = os.path.join(root, fn)
+            yield os.path.relpath(path, assets_dir).replace(os.sep, "/"), path
+
+def source_state(path):
+    st = os.stat(path)
+    return [st.st_mtime_ns, st.st_size]
+
+def encode(key, path):
+    ext = os.path.splitext(key)[1].lower()
+    if ext in IMAGE_EXT:
+        surf = pygame.image.load(path)
+        return {"kind": "image", "wh": list(surf.get_size())}, pygame.image.tobytes(surf, "RGBA")
+    if ext in SOUND_EXT:
+        return {"kind": "sound"}, pygame.mixer.Sound(path).get_raw()
+    with open(path, "rb") as f:
+        return {"kind": "data"}, f.read()
+
+def build(assets_dir, out, extra=None, skip=()):
+    # extra: {key: (entry, bytes)} generated at pack time, e.g. placeholders the game would otherwise draw at startup
+    entries = {}; blobs = []; sources = {}
+    for key, path in iter_files(assets_dir):
+        if key in skip:
+            continue
+        try:
+            entry, raw = encode(key, path)
+        except Exception as e:
+            print("Skipping", path, e); continue
+        entries[key] = entry; blobs.append((key, raw)); sources[key] = source_state(path)
+    for key, (entry, raw) in (extra or {}).items():
+        if key not in entries:
+            entries[key] = entry; blobs.append((key, raw))
+    # offsets depend on the index length, so lay out with a guess and redo until the index stops growing
+    index_len = 0
+    while True:
+        pos = 9 + index_len
+        for key, raw in blobs:
+            pos = -(-pos // ALIGN) * ALIGN
+            entries[key].update(offset=pos, size=len(raw)); pos += len(raw)
+        index = json.dumps({"entries": entries, "sources": sources, "audio": pygame.mixer.get_init()}).encode("utf-8")
+        if len(index) <= index_len:
+            break
+        index_len = len(index) + 256
+    tmp = out + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC + bytes([VERSION]) + struct.pack("<I", index_len) + index.ljust(index_len))
+        for key, raw in blobs:
+            f.seek(entries[key]["offset"]); f.write(raw)
+    os.replace(tmp, out)
+    return entries
+
+def stale_sources(pack, assets_dir):
+    current = {key: source_state(path) for key, path in iter_files(assets_dir)}
+    return sorted(k for k in set(current) | set(pack.sources) if current.get(k) != pack.sources.get(k))
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Pack the asset tree into one memory-mappable file of raw pixels and PCM")
+    ap.add_argument("--out", default=PACK_PATH)
+    ap.add_argument("--check", action="store_true", help="only report whether the pack matches the asset tree; exit 1 if not")
+    args = ap.parse_args(argv)
+
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy"); os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    from app_module import load_app
+    app = load_app()
+    if args.check:
+        pack = AssetPack.open(args.out)
+        stale = stale_sources(pack, app.ASSETS_DIR) if pack else ["(no pack)"]
+        print(f"{args.out}: {'fresh' if not stale else 'stale: ' + ', '.join(stale[:10])}")
+        return 1 if stale else 0
+    if app.PACK is not None:
+        app.PACK.close(); app.PACK = None   # the pack being replaced must not stay mapped (Windows cannot replace it)
+    pygame.mixer.init()
+    # a stale atlas would be trusted from the pack, so it is left out and the game slices sheets instead
+    skip = set()
+    for mode in SHEETS:
+        png, index_path = atlas_files(app.ATLAS_DIR, mode)
+        if os.path.exists(index_path):
+            with open(index_path, encoding="utf-8") as f:
+                fresh = is_fresh(json.load(f), app.ASSETS_DIR, mode)
+            if not fresh:
+                print(f"Atlas for {mode} is stale; not packing it (run atlas.py first).")
+                skip |= {os.path.relpath(p, app.ASSETS_DIR).replace(os.sep, "/") for p in (png, index_path)}
+    extra = {}
+    castle = app.castle_placeholder()
+    extra["knight/castle.png"] = ({"kind": "image", "wh": list(castle.get_size())}, pygame.image.tobytes(castle, "RGBA"))
+    entries = build(app.ASSETS_DIR, args.out, extra, skip)
+    kinds = {}
+    for e in entries.values():
+        kinds[e["kind"]] = kinds.get(e["kind"], 0) + 1
+    print(f"Wrote {args.out}: {kinds} ({os.path.getsize(args.out) // 1024} KB)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+import os, sys, json, hashlib, argparse
+import pygame
+
+ATLAS_VERSION = 1
+MAX_WIDTH = 2048
+
+# name, file, frame_w, frame_h, scale, pad_to; frame_w None means the whole image, unscaled and unflipped
+SHEETS = {
+    "knight": [
+        ("idle", "knight_idle.png", 100, 80, 2, (100,80)),
+        ("walk", "knight_walk.png", 100, 80, 2, (100,80)),
+        ("jump", "knight_jump.png", 30, 80, 3, (30,80)),
+        ("attack", "knight_attack.png", 40, 80, 3, (40,80)),
+        ("snake", "snake_walk.png", 16, 48, 3, None),
+        ("hyena", "hyena_walk.png", 24, 48, 3, None),
+        ("mummy", "mummy_walk.png", 24, 48, 3, None),
+    ],
+    "space": [
+        ("player", "player_ship.png", None, None, 1, None),
+        ("bullet", "bullet.png", None, None, 1, None),
+        ("alien", "enemy_alien.png", None, None, 1, None),
+        ("drone", "enemy_drone.png", None, None, 1, None),
+        ("boss", "enemy_boss.png", None, None, 1, None),
+    ],
+}
+
+def atlas_files(atlas_dir, mode):
+    return os.path.join(atlas_dir, f"{mode}.png"), os.path.join(atlas_dir, f"{mode}.json")
+
+def spec_list(mode):
+    return json.loads(json.dumps(SHEETS[mode]))
+
+def file_sha1(path):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def source_state(path):
+    if not os.path.exists(path):
+        return None
+    st = os.stat(path)
+    return {"mtime_ns": st.st_mtime_ns, "size": st.st_size, "sha1": file_sha1(path)}
+
+def is_fresh(index, assets_dir, mode):
+    if index.get("version") != ATLAS_VERSION or index.get("specs") != spec_list(mode):
+        return False
+    if set(index.get("sources", {})) != {fn for _, fn, *_ in SHEETS[mode]}:
+        return False
+    for fn, recorded in index["sources"].items():
+        path = os.path.join(assets_dir, mode, fn)
+        if not os.path.exists(path):
+            if recorded is not None: return False
+            continue
+        if recorded is None:
+            return False
+        st = os.stat(path)
+        if st.st_mtime_ns == recorded["mtime_ns"] and st.st_size == recorded["size"]:
+            continue
+        if st.st_size != recorded["size"] or file_sha1(path) != recorded["sha1"]:
+            return False
+    return True
+
+def pack(frames_by_name, max_width=MAX_WIDTH):
+    places = {}; x = y = shelf_h = width = 0
+    for name, (right, left) in frames_by_name.items():
+        entry = {"right": [], "left": []}
+        for side, frames in (("right", right), ("left", left)):
+            for f in frames:
+                w, h = f.get_size()
+                if x + w > max_width:
+                    x = 0; y += shelf_h; shelf_h = 0
+                entry[side].append([x, y, w, h])
+                x += w; shelf_h = max(shelf_h, h); width = max(width, x)
+        places[name] = entry
+    return places, (max(1, width), max(1, y + shelf_h))
+
+def build(mode, frames_by_name, assets_dir, atlas_dir):
+    frames_by_name = {k: v for k, v in frames_by_name.items() if v[0]}
+    places, size = pack(frames_by_name)
+    sheet = pygame.Surface(size, pygame.SRCALPHA)
+    for name, (right, left) in frames_by_name.items():
+        for side, frames in (("right", right), ("left", left)):
+            for f, (x, y, w, h) in zip(frames, places[name][side]):
+                sheet.blit(f, (x, y), None, pygame.BLEND_RGBA_MAX)
+    os.makedirs(atlas_dir, exist_ok=True)
+    png, index_path = atlas_files(atlas_dir, mode)
+    pygame.image.save(sheet, png)
+    index = {"version": ATLAS_VERSION, "mode": mode, "size": list(size), "specs": spec_list(mode),
+             "sources": {fn: source_state(os.path.join(assets_dir, mode, fn)) for _, fn, *_ in SHEETS[mode]},
+             "frames": places}
+    with open(index_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=1)
+    return png, index_path
+
+def load_atlas(mode, assets_dir, atlas_dir):
+    png, index_path = atlas_files(atlas_dir, mode)
+    if not (os.path.exists(png) and os.path.exists(index_path)):
+        return None
+    try:
+        with open(index_path, encoding="utf-8") as f:
+            index = json.load(f)
+        if not is_fresh(index, assets_dir, mode):
+            print(f"Atlas for {mode} is stale; slicing sheets at runtime (run atlas.py to rebuild).")
+            return None
+        sheet = pygame.image.load(png).convert_alpha()
+    except Exception as e:
+        print("Failed to load atlas:", png, e)
+        return None
+    return atlas_frames(sheet, index)
+
+def atlas_frames(sheet, index):
+    return {name: ([sheet.subsurface(pygame.Rect(r)) for r in e["right"]], [sheet.subsurface(pygame.Rect(r)) for r in e["left"]])
+            for name, e in index["frames"].items()}
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Pre-scale and pre-flip sprite sheets into one atlas per mode")
+    ap.add_argument("--mode", choices=["knight", "space", "all"], default="all")
+    ap.add_argument("--check", action="store_true", help="only report whether the atlases are fresh; exit 1 if not")
+    args = ap.parse_args(argv)
+
+    from app_module import load_app
+    app = load_app()
+    modes = list(SHEETS) if args.mode == "all" else [args.mode]
+    stale = 0
+    for mode in modes:
+        png, index_path = atlas_files(app.ATLAS_DIR, mode)
+        fresh = False
+        if os.path.exists(index_path):
+            with open(index_path, encoding="utf-8") as f:
+                fresh = is_fresh(json.load(f), app.ASSETS_DIR, mode) and os.path.exists(png)
+        if args.check:
+            print(f"{mode}: {'fresh' if fresh else 'stale'}")
+            stale += not fresh
+            continue
+        frames = app.load_mode_frames(mode, use_atlas=False)
+        build(mode, frames, app.ASSETS_DIR, app.ATLAS_DIR)
+        count = sum(len(r) + len(l) for r, l in frames.values())
+        print(f"{mode}: {count} frames -> {png}")
+    return 1 if stale else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
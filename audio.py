@@ -0,0 +1,83 @@
+import os, pygame
+
+# name: (file, category, minimum ms between two plays of the sound)
+SOUNDS = {
+    "knight": {"sword_swipe": ("sword_swipe.wav", "player", 80), "sword_hit": ("sword_hit.wav", "impact", 120),
+               "level_complete": ("level_complete.wav", "ui", 500)},
+    "space": {"laser": ("laser.wav", "player", 60), "explosion": ("explosion.wav", "impact", 50),
+              "ship_hit": ("ship_hit.wav", "impact", 150)},
+}
+VOICES = {"player": 2, "impact": 4, "ui": 1}
+
+class VoiceManager:
+    # game logic only calls trigger(), which marks the sound pending; flush() runs once per rendered frame and is the
+    # only place the mixer is touched, so repeats inside a frame collapse into one play and bursts cannot pile up voices
+    def __init__(self, voices=VOICES):
+        self.voices=dict(voices); self.enabled=False
+        self.sounds={}; self.pools={}; self.channels=[]; self.started=[]; self.pending={}; self.last={}
+        self.counts=dict.fromkeys(("triggered", "deduped", "throttled", "played", "stolen", "missing"), 0); self.peak=0
+
+    def init(self, assets_dir, mode, pack=None):
+        if not pygame.mixer.get_init():
+            try:
+                # an asset pack holds PCM already in its mixer format, so open the mixer in that format
+                pygame.mixer.init(*(pack.audio_format if pack is not None and pack.audio_format else ()))
+            except Exception as e:
+                print("Warning: audio mixer init failed:", e)
+                return False
+        # every channel is reserved for a category, so nothing else can grab one with Sound.play()
+        total = sum(self.voices.values()); first = 0
+        pygame.mixer.set_num_channels(total); pygame.mixer.set_reserved(total)
+        for category, n in self.voices.items():
+            self.pools[category] = range(first, first + n); first += n
+        self.channels = [pygame.mixer.Channel(i) for i in range(total)]; self.started = [0] * total
+        self.preload(assets_dir, mode, pack)
+        self.enabled = True
+        return True
+
+    def preload(self, assets_dir, mode, pack=None):
+        self.sounds.clear(); self.pending.clear(); self.last.clear()
+        from_pack = pack is not None and pack.audio_format == pygame.mixer.get_init()
+        for name, (filename, category, gap) in SOUNDS.get(mode, {}).items():
+            path = os.path.join(assets_dir, mode, "sfx", filename); key = f"{mode}/sfx/{filename}"
+            if not (from_pack and key in pack) and not os.path.exists(path):
+                continue
+            try:
+                sound = pack.sound(key) if from_pack and key in pack else pygame.mixer.Sound(path)
+                self.sounds[name] = (sound, self.pools[category], gap)
+            except Exception as e:
+                print("Failed to load SFX:", path, e)
+
+    def trigger(self, name):
+        if not self.enabled: return
+        self.counts["triggered"] += 1
+        if name in self.pending: self.counts["deduped"] += 1
+        else: self.pending[name] = True
+
+    def flush(self, now=None):
+        if not self.pending: return
+        now = pygame.time.get_ticks() if now is None else now
+        for name in self.pending:
+            entry = self.sounds.get(name)
+            if entry is None:
+                self.counts["missing"] += 1; continue
+            sound, pool, gap = entry
+            if now - self.last.get(name, -gap) < gap:
+                self.counts["throttled"] += 1; continue
+            i = next((i for i in pool if not self.channels[i].get_busy()), None)
+            if i is None:
+                # the pool is full: cut the voice that has been playing longest rather than stack another one
+                i = min(pool, key=self.started.__getitem__); self.counts["stolen"] += 1
+            self.channels[i].play(sound); self.started[i] = now
+            self.last[name] = now; self.counts["played"] += 1
+        self.pending.clear()
+        self.peak = max(self.peak, self.busy())
+
+    def busy(self):
+        return sum(c.get_busy() for c in self.channels)
+
+    def telemetry(self):
+        return {"voices": self.busy()} if self.enabled else {}
+
+    def stats(self):
+        return {**self.counts, "peak_voices": self.peak, "voices": sum(self.voices.values()), "loaded": sorted(self.sounds)}
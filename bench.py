@@ -0,0 +1,180 @@
+import os, sys, io, json, time, random, argparse, platform, tempfile, contextlib, statistics, subprocess
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+from app_module import load_app
+from storycache import StoryCache
+
+STORIES = [
+    "The knight starts in the forest, journeys across the desert, and finally reaches the tomb of mummies.",
+    "A brave knight must cross the hot desert, where hyenas attack near the cactus fields.",
+    "In the haunted graveyard, mummies rise from the tomb to stop the hero before the castle.",
+    "A fleet of ships clears orbit, survives the asteroid belt, and finally fights the alien boss in the nebula.",
+    "The pilot enters an asteroid belt where drones attack from all sides.",
+]
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter(); fn(); samples.append((time.perf_counter() - t0) * 1000.0)
+    return samples
+
+def record(name, samples, **extra):
+    samples = sorted(samples)
+    return {"name": name, "samples": len(samples),
+            "mean_ms": round(statistics.fmean(samples), 4),
+            "median_ms": round(statistics.median(samples), 4),
+            "p95_ms": round(samples[min(len(samples)-1, int(len(samples)*0.95))], 4),
+            **extra}
+
+def bench_classify(app, repeat):
+    # a cache that keeps nothing: every sample pays for the real classification (and timeline) instead of a lookup
+    cache = app.classifier.cache; app.classifier.cache = StoryCache(None, max_items=0)
+    out = []
+    try:
+        for n in (1, 10, 100):
+            text = " ".join(STORIES) * n
+            with contextlib.redirect_stdout(io.StringIO()):
+                samples = timed(lambda: app.choose_mode_from_model_safe(text), repeat)
+            out.append(record("classify", samples, chars=len(text), model=app.classifier.model is not None))
+    finally:
+        app.classifier.cache = cache
+    return out
+
+def bench_slice(app, repeat, tmpdir):
+    pg = app.pygame
+    out = []
+    for frames in (4, 16, 64):
+        path = os.path.join(tmpdir, f"sheet_{frames}.png")
+        sheet = pg.Surface((100*frames, 80), pg.SRCALPHA)
+        for i in range(frames):
+            pg.draw.rect(sheet, (40*i % 255, 120, 200, 255), (100*i+20, 10, 60, 70))
+        pg.image.save(sheet, path)
+        out.append(record("slice_sheet", timed(lambda: app.slice_sheet(path, 100, 80), repeat), frames=frames))
+        sliced = app.slice_sheet(path, 100, 80)
+        out.append(record("normalize_and_scale", timed(lambda: app.normalize_and_scale(sliced, scale=2, pad_to=(100,80)), repeat), frames=frames))
+    return out
+
+def bench_import(repeat):
+    code = "from app_module import load_app; load_app()"
+    here = os.path.dirname(os.path.abspath(__file__))
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], cwd=here, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        samples.append((time.perf_counter() - t0) * 1000.0)
+    return [record("cold_import", samples)]
+
+def bench_construct(app, repeat):
+    return [record("KnightGame.__init__", timed(lambda: app.KnightGame(STORIES[0]), repeat)),
+            record("SpaceGame.__init__", timed(lambda: app.SpaceGame(STORIES[3]), repeat))]
+
+def fill_knight(app, game, count, rng):
+    while len(game.enemies) < count:
+        x = rng.randint(110, app.WIDTH - 200)
+        game.add_enemy("hyena", x, speed=rng.choice((-3, -2, 2, 3)), hp=10**9)
+
+def fill_space(app, game, enemies, bullets, rng):
+    while len(game.enemies) < enemies:
+        game.add_enemy(rng.choice(("alien", "drone")), rng.randint(20, app.WIDTH-20), rng.randint(0, app.HEIGHT//2),
+                       speed=rng.randint(1, 3), hp=10**9, pattern=rng.choice(("straight", "zig")))
+    while len(game.bullets) < bullets:
+        game.bullets.add(vy=-10, **app.centered(game.bullet_img, rng.randint(0, app.WIDTH), rng.randint(0, app.HEIGHT)))
+
+def frame_phases(game, keys, frames, refill):
+    phases = {"update": [], "collide": [], "draw": []}
+    for _ in range(frames):
+        refill()
+        t0 = time.perf_counter(); game.update_sprites(keys, 16)
+        t1 = time.perf_counter(); game.collide()
+        t2 = time.perf_counter(); game.draw()
+        t3 = time.perf_counter()
+        phases["update"].append((t1-t0)*1000.0); phases["collide"].append((t2-t1)*1000.0); phases["draw"].append((t3-t2)*1000.0)
+    return phases
+
+def bench_frames(app, frames, counts):
+    rng = random.Random(0)
+    keys = app.KeyMask(app.KEY_BITS[app.pygame.K_RIGHT] | app.KEY_BITS[app.pygame.K_a] | app.KEY_BITS[app.pygame.K_SPACE])
+    out = []
+    knight = app.KnightGame(STORIES[0])
+    knight.renderer.set_background(knight.static_layer(knight.levels[0]))
+    space = app.SpaceGame(STORIES[3])
+    space.renderer.set_background(space.static_layer(space.missions[0]))
+    for n in counts:
+        knight.reset(); knight.enemies.clear(); knight.player.health = 10**9
+        phases = frame_phases(knight, keys, frames, lambda: fill_knight(app, knight, n, rng))
+        out += [record(f"knight.{k}", v, enemies=n) for k, v in phases.items()]
+        space.reset(); space.player.hp = 10**9
+        phases = frame_phases(space, keys, frames, lambda: fill_space(app, space, n, n, rng))
+        out += [record(f"space.{k}", v, enemies=n, bullets=n) for k, v in phases.items()]
+    return out
+
+def bench_headless(app, repeat, runs=10):
+    # whole seeded headless runs, where entity counts stay small: tracks the per-tick cost CI pays, in ms per 1000 ticks
+    out = []
+    for mode, story in (("knight", STORIES[0]), ("space", STORIES[3])):
+        samples = []; rate = []
+        for _ in range(max(1, repeat // 4)):
+            with contextlib.redirect_stdout(io.StringIO()):
+                s = app.run_headless(mode, story, runs)
+            samples.append(s["seconds"] * 1e6 / s["ticks"]); rate.append(s["ticks_per_sec"])
+        out.append(record(f"headless.{mode}.per_1k_ticks", samples, ticks_per_sec=round(statistics.median(rate))))
+    return out
+
+def key_of(r):
+    return (r["name"],) + tuple(sorted((k, v) for k, v in r.items() if k in ("chars", "frames", "enemies", "bullets")))
+
+def compare(results, baseline_path, tolerance):
+    with open(baseline_path, encoding="utf-8") as f:
+        base = {key_of(r): r for r in json.load(f)["results"]}
+    regressions = []
+    for r in results:
+        b = base.get(key_of(r))
+        if b and b["median_ms"] > 0 and r["median_ms"] > b["median_ms"] * (1 + tolerance):
+            regressions.append((r, b))
+    for r, b in regressions:
+        print(f"REGRESSION {key_of(r)}: {b['median_ms']:.3f} ms -> {r['median_ms']:.3f} ms")
+    return regressions
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="StoryToGame benchmarks")
+    ap.add_argument("--out", default="bench_results.json", help="where to write the JSON results")
+    ap.add_argument("--repeat", type=int, default=20, help="samples for classification/slicing/construction")
+    ap.add_argument("--frames", type=int, default=120, help="frames per entity-count step")
+    ap.add_argument("--counts", default="10,50,200,1000", help="comma separated enemy/bullet counts")
+    ap.add_argument("--only", default="import,classify,slice,construct,frames,headless", help="comma separated subset to run")
+    ap.add_argument("--compare", help="baseline JSON; exit 1 if any median is slower than --tolerance")
+    ap.add_argument("--tolerance", type=float, default=0.25)
+    args = ap.parse_args(argv)
+    only = set(args.only.split(","))
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        app = load_app()
+        app.classifier.load()
+    app.classifier.cache = StoryCache(None)   # in memory only: no run writes story_cache.sqlite or reads an earlier run's
+    app.VERBOSE = False
+    results = []
+    if "import" in only: results += bench_import(max(1, args.repeat // 4))
+    if "classify" in only: results += bench_classify(app, args.repeat)
+    if "slice" in only:
+        with tempfile.TemporaryDirectory() as tmp:
+            results += bench_slice(app, args.repeat, tmp)
+    if "construct" in only: results += bench_construct(app, args.repeat)
+    if "frames" in only: results += bench_frames(app, args.frames, [int(c) for c in args.counts.split(",")])
+    if "headless" in only: results += bench_headless(app, args.repeat)
+
+    for r in results:
+        extra = " ".join(f"{k}={v}" for k, v in r.items() if k in ("chars", "frames", "enemies", "bullets"))
+        print(f"{r['name']:<24} {extra:<24} median {r['median_ms']:9.3f} ms  p95 {r['p95_ms']:9.3f} ms")
+    meta = {"python": platform.python_version(), "pygame": app.pygame.version.ver, "platform": platform.platform(),
+            "video_driver": os.environ.get("SDL_VIDEODRIVER"), "time": time.strftime("%Y-%m-%dT%H:%M:%S")}
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump({"meta": meta, "results": results}, f, indent=1)
+    print("Wrote", args.out)
+    if args.compare and compare(results, args.compare, args.tolerance):
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,204 @@
+import os, sys, json, time, argparse
+from keywords import SPACE_KEYWORDS, STORY_MATCHER
+from storycache import StoryCache, story_key, file_digest, digest
+
+MODEL_PATH = "story_model.joblib"
+VECT_PATH = "vectorizer.joblib"
+MLB_PATH = "mlb.joblib"
+NPZ_PATH = "story_model.npz"
+
+def keyword_override_space(s):
+    return STORY_MATCHER.has(s, "space")
+
+def mode_from_labels(labels):
+    if not labels:
+        return None
+    if any("space" in l.lower() or "alien" in l.lower() or "ship" in l.lower() for l in labels):
+        return "space"
+    return "knight"
+
+class StoryClassifier:
+    def __init__(self, model_path=MODEL_PATH, vect_path=VECT_PATH, mlb_path=MLB_PATH, threshold=0.5, cache=None, npz_path=NPZ_PATH):
+        self.model_path=model_path; self.vect_path=vect_path; self.mlb_path=mlb_path; self.npz_path=npz_path
+        self.threshold=threshold; self.cache=cache; self.fp=None
+        self.model=None; self.vect=None; self.label_names=None
+        self.loaded=False; self.stories_seen=0; self.batches=0
+
+    def load(self):
+        if self.loaded:
+            return self.model is not None
+        self.loaded = True
+        if self.load_npz():
+            return True
+        try:
+            import joblib
+            if not (os.path.exists(self.model_path) and os.path.exists(self.vect_path)):
+                print("Model/vectorizer not found; using keyword fallback.")
+                return False
+            self.model = joblib.load(self.model_path)
+            self.vect = joblib.load(self.vect_path)
+            if os.path.exists(self.mlb_path):
+                self.label_names = [str(c) for c in joblib.load(self.mlb_path).classes_]
+            elif hasattr(self.model, "classes_") and all(isinstance(c, str) for c in self.model.classes_):
+                self.label_names = list(self.model.classes_)
+            print("Loaded ML model & vectorizer.")
+            return True
+        except Exception as e:
+            print("joblib/sklearn not available or failed to load model:", e)
+            self.model = self.vect = None
+            return False
+
+    def load_npz(self):
+        # the exported scorer needs only NumPy; it is skipped when the joblib files it came from have changed since export
+        if not self.npz_path or not os.path.exists(self.npz_path):
+            return False
+        try:
+            from npmodel import NumpyScorer
+            scorer = NumpyScorer.load(self.npz_path)
+        except Exception as e:
+            print("Failed to load", self.npz_path, e)
+            return False
+        paths = {"model": self.model_path, "vectorizer": self.vect_path, "mlb": self.mlb_path}
+        stale = [paths[k] for k, d in scorer.source.items() if k in paths and os.path.exists(paths[k]) and file_digest(paths[k]) != d]
+        if stale:
+            print(f"{self.npz_path} is older than {', '.join(stale)}; re-export with npmodel.py. Using joblib.")
+            return False
+        self.model = scorer; self.label_names = scorer.labels
+        print("Loaded NumPy model", self.npz_path)
+        return True
+
+    def predict(self, stories):
+        import numpy as np
+        if self.vect is None:
+            # NumpyScorer already returns one positive-class column per label
+            raw = None; probs = self.model.predict_proba(stories)
+        else:
+            raw = self.model.predict_proba(self.vect.transform(stories))
+            probs = np.column_stack([p[:, -1] for p in raw]) if isinstance(raw, list) else None
+        self.stories_seen += len(stories); self.batches += 1
+        if probs is not None:
+            names = self.label_names if self.label_names and len(self.label_names) == probs.shape[1] else None
+            out = []
+            for row in probs:
+                if names is None:
+                    out.append(([], {str(j): float(p) for j, p in enumerate(row)}))
+                else:
+                    out.append(([names[j] for j in np.flatnonzero(row > self.threshold)], dict(zip(names, map(float, row)))))
+            return out
+        classes = [str(c) for c in self.model.classes_]
+        return [([classes[int(row.argmax())]], dict(zip(classes, map(float, row)))) for row in raw]
+
+    def fingerprint(self):
+        # what a cached result depends on besides the story: the artifacts on disk, whether they loaded, and the keyword table
+        if self.fp is None:
+            self.load()
+            self.fp = "|".join([file_digest(self.model_path), file_digest(self.vect_path), file_digest(self.mlb_path), file_digest(self.npz_path),
+                                str(self.model is not None), str(self.threshold), digest(STORY_MATCHER.table)])
+        return self.fp
+
+    def classify_batch(self, stories):
+        stories = list(stories)
+        if self.cache is None:
+            return self.classify_uncached(stories)
+        fp = self.fingerprint()
+        keys = [story_key(t, fp) for t in stories]
+        results = [self.cache.get(k) for k in keys]
+        missing = [i for i, r in enumerate(results) if r is None]
+        if missing:
+            fresh = self.classify_uncached([stories[i] for i in missing])
+            for i, r in zip(missing, fresh):
+                results[i] = r
+            self.cache.put_many([(keys[i], r) for i, r in zip(missing, fresh)])
+        return results
+
+    def classify_uncached(self, stories):
+        predictions = self.predict(stories) if stories and self.load() else [None] * len(stories)
+        results = []
+        for text, pred in zip(stories, predictions):
+            labels, probs = pred if pred else ([], {})
+            keywords = STORY_MATCHER.labels(text)
+            if "space" in keywords:
+                mode, source = "space", "keyword"
+            elif mode_from_labels(labels):
+                mode, source = mode_from_labels(labels), "model"
+            else:
+                mode, source = "knight", "fallback"
+            results.append({"mode": mode, "source": source, "labels": labels, "probs": probs, "keywords": keywords})
+        return results
+
+def iter_batches(lines, size):
+    batch = []
+    for line in lines:
+        line = line.strip()
+        if not line: continue
+        batch.append(line)
+        if len(batch) >= size:
+            yield batch; batch = []
+    if batch:
+        yield batch
+
+def serve(clf, host="127.0.0.1", port=8765):
+    from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+    class Handler(BaseHTTPRequestHandler):
+        def reply(self, code, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers(); self.wfile.write(body)
+        def do_GET(self):
+            if self.path == "/health":
+                self.reply(200, {"ok": True, "model": clf.model is not None, "labels": clf.label_names,
+                                 "stories": clf.stories_seen, "batches": clf.batches,
+                                 "cache": clf.cache.stats() if clf.cache else None})
+            else:
+                self.reply(404, {"error": "not found"})
+        def do_POST(self):
+            if self.path != "/classify":
+                return self.reply(404, {"error": "not found"})
+            try:
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                stories = body["stories"] if "stories" in body else [body["story"]]
+            except Exception as e:
+                return self.reply(400, {"error": f"expected {{'stories': [...]}}: {e}"})
+            self.reply(200, {"results": clf.classify_batch(stories)})
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    print(f"Classifier listening on http://{host}:{port} (POST /classify, GET /health)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Batch story classifier: one story per line in, one JSON result per line out")
+    ap.add_argument("files", nargs="*", help="story files (default: stdin)")
+    ap.add_argument("--batch-size", type=int, default=256)
+    ap.add_argument("--serve", type=int, metavar="PORT", help="run as a local HTTP service instead")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--no-cache", action="store_true", help="classify every story even if it was seen before")
+    args = ap.parse_args(argv)
+
+    clf = StoryClassifier(cache=None if args.no_cache else StoryCache())
+    clf.load()
+    if args.serve:
+        serve(clf, args.host, args.serve)
+        return 0
+    t0 = time.perf_counter()
+    for path in args.files or ["-"]:
+        f = sys.stdin if path == "-" else open(path, encoding="utf-8")
+        with f:
+            for batch in iter_batches(f, args.batch_size):
+                for text, res in zip(batch, clf.classify_batch(batch)):
+                    print(json.dumps({"story": text, **res}))
+    elapsed = time.perf_counter() - t0
+    print(f"Classified {clf.stories_seen} stories in {clf.batches} batches ({elapsed:.2f}s)", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
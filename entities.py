@@ -0,0 +1,199 @@
+import numpy as np
+
+# stores of at most this many rows keep their columns in Python lists: at that size a loop over lists beats the fixed cost
+# of every NumPy call. A store switches to arrays when it grows past it and back once compaction halves it.
+SMALL_STORE = 32
+
+# rows of one entity kind live in parallel arrays; every store has integer x, y, w, h (the rect) plus its own columns.
+# store.<column> is a view of the live rows, refreshed whenever the row count changes, so hot loops pay a plain attribute lookup.
+# The arrays are allocated up front and act as the pool: dead rows are compacted away and their slots reused by the next spawn.
+# While the store is small, store.lists holds the columns as lists (None otherwise) and is what hot loops should use;
+# store.<column> then builds a read-only array, fine for drawing and observing; element writes raise instead of being lost.
+class EntityStore:
+    def __init__(self, fields, capacity=256, small=SMALL_STORE):
+        self.fields = {"x": np.int32, "y": np.int32, "w": np.int32, "h": np.int32, **fields}
+        self.data = {k: np.zeros(capacity, dt) for k, dt in self.fields.items()}
+        self.peak=0; self.spawned=0; self.recycled=0; self.freed=0; self.grows=0; self.small=small; self.lists=None
+        self.used=0   # array slots ever written; only spawns into these count as recycled
+        self.resize(0); self.to_lists()
+
+    def __len__(self):
+        return self.n
+
+    def __getattr__(self, name):
+        lists = self.__dict__.get("lists")
+        if lists is not None and name in lists:
+            a = np.array(lists[name], self.fields[name]); a.flags.writeable = False
+            return a
+        raise AttributeError(name)
+
+    def __setattr__(self, name, value):
+        data = self.__dict__.get("data")
+        if data is not None and name in data:
+            if self.lists is not None:
+                self.lists[name][:] = np.broadcast_to(np.asarray(value, self.fields[name]), self.n).tolist()
+            else:
+                data[name][:self.n] = value
+        else:
+            object.__setattr__(self, name, value)
+
+    def resize(self, n):
+        self.__dict__["n"] = n
+        if self.lists is None:
+            for k, a in self.data.items():
+                self.__dict__[k] = a[:n]
+
+    def to_lists(self):
+        self.lists = {k: a[:self.n].tolist() for k, a in self.data.items()}
+        for k in self.data:
+            self.__dict__.pop(k, None)
+
+    def to_arrays(self):
+        self.reserve(0)
+        lists = self.lists; self.lists = None
+        for k, a in self.data.items():
+            a[:self.n] = lists[k]
+        self.used = max(self.used, self.n)
+        self.resize(self.n)
+
+    def column(self, k):
+        return self.lists[k] if self.lists is not None else self.data[k][:self.n].tolist()
+
+    def capacity(self):
+        return len(self.data["x"])
+
+    def reserve(self, extra):
+        need = self.n + extra
+        if need <= self.capacity():
+            return
+        cap = max(need, self.capacity() * 2); self.grows += 1
+        for k, a in self.data.items():
+            b = np.zeros(cap, a.dtype)
+            if self.lists is None: b[:self.n] = a[:self.n]
+            self.data[k] = b
+        self.resize(self.n)
+
+    def extend(self, count, **cols):
+        if count <= 0:
+            return
+        if self.lists is not None and self.n + count > self.small:
+            self.to_arrays()
+        if self.lists is not None:
+            for k, dt in self.fields.items():
+                v = cols.get(k, 0)
+                self.lists[k] += [dt(v).item()] * count if np.ndim(v) == 0 else np.asarray(v, dt).tolist()
+        else:
+            self.reserve(count)
+            rows = slice(self.n, self.n + count)
+            for k, a in self.data.items():
+                a[rows] = cols.get(k, 0)
+            self.recycled += max(0, min(count, self.used - self.n)); self.used = max(self.used, self.n + count)
+        self.spawned += count
+        self.resize(self.n + count); self.peak = max(self.peak, self.n)
+
+    def add(self, **cols):
+        self.extend(1, **cols)
+
+    def compact(self, keep):
+        # keep: one truth value per row, as an array or a list. Lists are edited in place, so references stay valid.
+        kept = int(np.count_nonzero(keep))
+        if kept == self.n:
+            return 0
+        if self.lists is not None:
+            keep = keep.tolist() if isinstance(keep, np.ndarray) else keep
+            for col in self.lists.values():
+                col[:] = [v for v, k in zip(col, keep) if k]
+        else:
+            for a in self.data.values():
+                a[:kept] = a[:self.n][keep]
+        removed = self.n - kept
+        self.freed += removed
+        self.resize(kept)
+        if self.lists is None and kept <= self.small // 2:
+            self.to_lists()
+        return removed
+
+    def clear(self):
+        self.freed += self.n
+        self.resize(0); self.to_lists()
+
+    def stats(self):
+        # capacity and recycled describe the array pool, so a store that has only ever lived in lists reports neither
+        arrays = self.lists is None
+        return {"live": self.n, "backing": "arrays" if arrays else "lists", "capacity": self.capacity() if arrays else 0,
+                "peak": self.peak, "spawned": self.spawned,
+                "recycled": self.recycled, "freed": self.freed, "grows": self.grows,
+                "reuse_rate": self.recycled/self.spawned if self.spawned else 0.0}
+
+    def overlaps(self, rect):
+        # Rect.colliderect against every row at once; the vertical test only runs when something overlaps horizontally
+        x = self.x
+        m = (x < rect.right) & (x + self.w > rect.left)
+        if np.count_nonzero(m):
+            y = self.y
+            m &= (y < rect.bottom) & (y + self.h > rect.top)
+        return m
+
+    def pairs(self, other):
+        # every overlapping (our row, their row), sorted. Their rows are bucketed by top-left cell on a grid of half
+        # their largest size; each of our rows only visits the few cells a top-left corner touching it can be in.
+        empty = np.zeros(0, np.intp)
+        if not self.n or not other.n:
+            return empty, empty
+        ow = int(other.w.max()); oh = int(other.h.max())
+        cell = max(8, (max(ow, oh) + 1) // 2)
+        scx = self.x // cell; scy = self.y // cell; ocx = other.x // cell; ocy = other.y // cell
+        reach_x = range(-ow // cell, -(-int(self.w.max()) // cell) + 1)
+        reach_y = range(-oh // cell, -(-int(self.h.max()) // cell) + 1)
+        base = min(scx.min(), ocx.min()) + reach_x.start
+        cols = int(max(scx.max(), ocx.max()) - base + reach_x.stop + 1)
+        okey = ocy.astype(np.int64) * cols + (ocx - base)
+        order = np.argsort(okey, kind="stable"); skey = okey[order]
+        # one probe per (row, neighbouring cell), all looked up in a single pass
+        dy, dx = np.meshgrid(np.array(reach_y), np.array(reach_x), indexing="ij")
+        probe = ((scy.astype(np.int64)[None, :] + dy.reshape(-1, 1)) * cols + (scx - base)[None, :] + dx.reshape(-1, 1)).ravel()
+        lo = np.searchsorted(skey, probe, "left"); count = np.searchsorted(skey, probe, "right") - lo
+        total = int(count.sum())
+        if not total:
+            return empty, empty
+        r = np.repeat(np.tile(np.arange(self.n), dy.size), count)
+        c = order[np.repeat(lo - (np.cumsum(count) - count), count) + np.arange(total)]
+        keep = ((self.x[r] < other.x[c] + other.w[c]) & (self.x[r] + self.w[r] > other.x[c]) &
+                (self.y[r] < other.y[c] + other.h[c]) & (self.y[r] + self.h[r] > other.y[c]))
+        r = r[keep]; c = c[keep]
+        idx = np.lexsort((c, r))
+        return r[idx], c[idx]
+
+    def hits(self, other, small=1024):
+        # (row, overlapping rows of other in insertion order) for each of our rows touching anything in other
+        if not self.n or not other.n:
+            return
+        if self.n * other.n <= small:
+            # a handful of pairs is cheaper to test in Python than to set up the arrays
+            col = other.column
+            theirs = [(x, y, x + w, y + h) for x, y, w, h in zip(col("x"), col("y"), col("w"), col("h"))]
+            col = self.column
+            for i, (x0, y0, w, h) in enumerate(zip(col("x"), col("y"), col("w"), col("h"))):
+                x1 = x0 + w; y1 = y0 + h
+                found = [j for j, (ox0, oy0, ox1, oy1) in enumerate(theirs) if x0 < ox1 and x1 > ox0 and y0 < oy1 and y1 > oy0]
+                if found:
+                    yield i, found
+            return
+        r, c = self.pairs(other)
+        if not r.size:
+            return
+        starts = np.flatnonzero(r[1:] != r[:-1]) + 1
+        bounds = [0] + starts.tolist() + [r.size]
+        c = c.tolist()
+        for i, a, b in zip(r[bounds[:-1]].tolist(), bounds[:-1], bounds[1:]):
+            yield i, c[a:b]
+
+    def touching(self, rect):
+        # overlaps() for list-backed stores: the indices of rows overlapping rect
+        col = self.column; left, top, right, bottom = rect.left, rect.top, rect.right, rect.bottom
+        return [i for i, (x, y, w, h) in enumerate(zip(col("x"), col("y"), col("w"), col("h")))
+                if x < right and x + w > left and y < bottom and y + h > top]
+
+    def rects(self):
+        col = self.column
+        return list(zip(col("x"), col("y"), col("w"), col("h")))
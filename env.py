@@ -0,0 +1,200 @@
+import os, sys, json, time, random, argparse
+import numpy as np
+from multiprocessing import get_context, shared_memory
+from app_module import load_app
+
+N_ACTIONS = 64          # an action is a key bitmask over LEFT, RIGHT, UP, DOWN, SPACE, A (see KEY_BITS)
+MAX_ENEMIES = 16
+OBS_SIZE = 5 + 3 * MAX_ENEMIES
+
+class GameEnv:
+    # one game driven as reset()/step(action); observations are player (x, y, hp, level, enemies left) plus the
+    # nearest enemies as (dx, dy, hp), padded with zeros
+    def __init__(self, mode=None, story=None, levels=None, level_seed=0, max_ticks=20000, repeat=1):
+        self.app = load_app(); self.app.VERBOSE = False
+        self.mode=mode; self.story=story or self.app.DEFAULT_STORY; self.levels=levels; self.level_seed=level_seed
+        self.max_ticks=max_ticks; self.repeat=repeat
+        self.game=None; self.ticks=0; self.last=None; self.obs=np.zeros(OBS_SIZE, np.float32)
+
+    def build(self):
+        app = self.app
+        mode = self.mode or app.classifier.classify_batch([self.story])[0]["mode"]
+        campaign = app.make_campaign(mode, self.story, self.levels, self.level_seed) if self.levels else None
+        self.game = app.KnightGame(self.story, campaign) if mode == "knight" else app.SpaceGame(self.story, campaign)
+        self.keys = app.KeyMask()
+
+    def reset(self, seed=None, story=None, out=None):
+        if story is not None and story != self.story:
+            self.story = story; self.game = None
+        if self.game is None:
+            self.build()
+        self.game.rng = random.Random(seed)
+        self.game.reset(); self.ticks = 0; self.last = self.progress()
+        return self.observe(out), {"level": self.level()}
+
+    def level(self):
+        g = self.game
+        return g.current_index if hasattr(g, "levels") else g.current_idx
+
+    def hp(self):
+        p = self.game.player
+        return p.health if hasattr(p, "health") else p.hp
+
+    def progress(self):
+        return (self.level(), self.hp(), self.game.kills, self.game.player.rect.x)
+
+    def step(self, action, out=None):
+        g = self.game; self.keys.mask = int(action); outcome = None
+        for _ in range(self.repeat):
+            result = g.step(self.keys, self.app.FIXED_DT); self.ticks += 1
+            if result == "dead":
+                outcome = "dead"; break
+            if result == "complete" and not g.next_level():
+                outcome = "win"; break
+        level, hp, kills, x = now = self.progress()
+        was_level, was_hp, was_kills, was_x = self.last; self.last = now
+        reward = (kills - was_kills) + 10.0 * (level - was_level) - (was_hp - hp)
+        if level == was_level and hasattr(g, "levels"):
+            reward += (x - was_x) / 100.0
+        if outcome == "dead": reward -= 10.0
+        truncated = outcome is None and self.ticks >= self.max_ticks
+        info = {"outcome": "timeout" if truncated else outcome, "level": level, "ticks": self.ticks}
+        return self.observe(out), reward, outcome is not None, truncated, info
+
+    def observe(self, out=None):
+        obs = self.obs if out is None else out
+        obs[:] = 0
+        g = self.game; app = self.app; px, py = g.player.rect.center
+        e = g.enemies; n = len(e)
+        obs[:5] = (px / app.WIDTH, py / app.HEIGHT, self.hp(), self.level(), n)
+        if n:
+            dx = (e.x + e.w / 2 - px) / app.WIDTH; dy = (e.y + e.h / 2 - py) / app.HEIGHT
+            near = np.argsort(dx * dx + dy * dy, kind="stable")[:MAX_ENEMIES]
+            k = len(near)
+            rows = obs[5:5 + 3 * k].reshape(k, 3)
+            rows[:, 0] = dx[near]; rows[:, 1] = dy[near]; rows[:, 2] = e.hp[near]
+        return obs
+
+class VecEnv:
+    # N environments in lockstep in this process. A finished environment is reset in place; step() returns the
+    # final info of every episode that ended, tagged with its env index. Env i's k-th episode is seeded from (seed, i, k).
+    def __init__(self, n, seed=0, offset=0, obs=None, rewards=None, dones=None, **kw):
+        self.envs = [GameEnv(**kw) for _ in range(n)]; self.seed=seed; self.offset=offset; self.episodes=[0] * n
+        self.obs = np.zeros((n, OBS_SIZE), np.float32) if obs is None else obs
+        self.rewards = np.zeros(n, np.float32) if rewards is None else rewards
+        self.dones = np.zeros(n, bool) if dones is None else dones
+
+    def episode_seed(self, i):
+        return self.seed + (self.offset + i) * 100003 + self.episodes[i]
+
+    def reset(self):
+        for i, env in enumerate(self.envs):
+            env.reset(self.episode_seed(i), out=self.obs[i])
+        return self.obs
+
+    def step(self, actions):
+        infos = []
+        for i, (env, a) in enumerate(zip(self.envs, actions)):
+            _, r, term, trunc, info = env.step(a, out=self.obs[i])
+            self.rewards[i] = r; self.dones[i] = term or trunc
+            if term or trunc:
+                self.episodes[i] += 1; env.reset(self.episode_seed(i), out=self.obs[i])
+                infos.append({**info, "env": self.offset + i})
+        return self.obs, self.rewards, self.dones, infos
+
+    def close(self):
+        pass
+
+def shard_worker(conn, names, lo, hi, n, seed, kw):
+    # steps envs [lo, hi) of the batch and reads/writes their rows of the shared arrays directly
+    bufs = [shared_memory.SharedMemory(name=name) for name in names]
+    obs = np.ndarray((n, OBS_SIZE), np.float32, bufs[0].buf); rewards = np.ndarray(n, np.float32, bufs[1].buf)
+    dones = np.ndarray(n, bool, bufs[2].buf); actions = np.ndarray(n, np.uint8, bufs[3].buf)
+    vec = VecEnv(hi - lo, seed, lo, obs[lo:hi], rewards[lo:hi], dones[lo:hi], **kw)
+    try:
+        while True:
+            cmd = conn.recv()
+            if cmd == "step":
+                conn.send(vec.step(actions[lo:hi])[3])
+            elif cmd == "reset":
+                vec.reset(); conn.send(None)
+            else:
+                break
+    finally:
+        del vec, obs, rewards, dones, actions
+        for b in bufs: b.close()
+
+class SubprocVecEnv:
+    # the same interface as VecEnv with envs sharded over worker processes; per step only a command byte crosses the pipe
+    def __init__(self, n, workers=None, seed=0, **kw):
+        workers = max(1, min(n, workers or os.cpu_count() or 1))
+        sizes = (OBS_SIZE * 4 * n, 4 * n, n, n)
+        self.bufs = [shared_memory.SharedMemory(create=True, size=max(1, s)) for s in sizes]
+        self.obs = np.ndarray((n, OBS_SIZE), np.float32, self.bufs[0].buf); self.rewards = np.ndarray(n, np.float32, self.bufs[1].buf)
+        self.dones = np.ndarray(n, bool, self.bufs[2].buf); self.actions = np.ndarray(n, np.uint8, self.bufs[3].buf)
+        ctx = get_context("spawn"); self.conns = []; self.procs = []
+        bounds = np.linspace(0, n, workers + 1).astype(int)
+        for lo, hi in zip(bounds[:-1], bounds[1:]):
+            parent, child = ctx.Pipe()
+            p = ctx.Process(target=shard_worker, args=(child, [b.name for b in self.bufs], int(lo), int(hi), n, seed, kw), daemon=True)
+            p.start(); self.conns.append(parent); self.procs.append(p)
+
+    def reset(self):
+        for c in self.conns: c.send("reset")
+        for c in self.conns: c.recv()
+        return self.obs
+
+    def step(self, actions):
+        self.actions[:] = actions
+        for c in self.conns: c.send("step")
+        infos = []
+        for c in self.conns: infos += c.recv()
+        return self.obs, self.rewards, self.dones, infos
+
+    def close(self):
+        for c in self.conns:
+            try: c.send("close")
+            except (BrokenPipeError, OSError): pass
+        for p in self.procs: p.join(timeout=5)
+        del self.obs, self.rewards, self.dones, self.actions
+        for b in self.bufs:
+            try: b.close()
+            except BufferError: pass   # the caller still holds a view of the last step; the mapping goes when it does
+            b.unlink()
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Measure environment steps per second with random actions")
+    ap.add_argument("--mode", choices=["knight", "space"], default="knight")
+    ap.add_argument("--story", help="story for every env (default: the built-in one)")
+    ap.add_argument("--levels", type=int, help="generated campaign length")
+    ap.add_argument("--envs", type=int, default=8)
+    ap.add_argument("--workers", type=int, default=0, help="worker processes (0: step all envs in this process)")
+    ap.add_argument("--steps", type=int, default=2000, help="batched steps to time")
+    ap.add_argument("--repeat", type=int, default=1, help="game ticks per action")
+    ap.add_argument("--max-ticks", type=int, default=20000, help="truncate episodes after this many game ticks")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args(argv)
+
+    kw = {"mode": args.mode, "story": args.story, "levels": args.levels, "repeat": args.repeat, "max_ticks": args.max_ticks}
+    vec = SubprocVecEnv(args.envs, args.workers, args.seed, **kw) if args.workers else VecEnv(args.envs, args.seed, **kw)
+    rng = np.random.default_rng(args.seed)
+    try:
+        vec.reset()
+        episodes = {"win": 0, "dead": 0, "timeout": 0}; total = 0.0
+        t0 = time.perf_counter()
+        for _ in range(args.steps):
+            _, rewards, _, infos = vec.step(rng.integers(0, N_ACTIONS, args.envs))
+            total += float(rewards.sum())
+            for info in infos:
+                episodes[info["outcome"]] += 1
+        elapsed = time.perf_counter() - t0
+    finally:
+        vec.close()
+    steps = args.steps * args.envs
+    print(json.dumps({"mode": args.mode, "envs": args.envs, "workers": args.workers, "steps": steps,
+                      "seconds": round(elapsed, 3), "env_steps_per_sec": round(steps / elapsed),
+                      "episodes": episodes, "reward": round(total, 1)}))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
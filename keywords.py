@@ -0,0 +1,72 @@
+import os, re, json
+
+SPACE_KEYWORDS = ["space", "alien", "ship", "spaceship", "galaxy", "asteroid", "planet", "nebula", "ufo", "mothership"]
+
+DEFAULT_TABLE = {
+    "space": SPACE_KEYWORDS,
+    "forest": ["forest", "woods", "tree"],
+    "desert": ["desert", "sand", "dune"],
+    "graveyard": ["tomb", "grave", "mummy", "mummies", "crypt", "graveyard"],
+}
+
+def load_table(path=None):
+    if not path:
+        return DEFAULT_TABLE
+    with open(path, encoding="utf-8") as f:
+        return {label: list(words) for label, words in json.load(f).items()}
+
+def trie_pattern(words):
+    # factor shared prefixes so the regex engine does not retry every alternative at each word start
+    trie = {}
+    for w in words:
+        node = trie
+        for ch in w:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+    def emit(node):
+        alts = [(r"\s+" if ch == " " else re.escape(ch)) + emit(sub) for ch, sub in sorted(node.items()) if ch]
+        if not alts:
+            return ""
+        body = alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+        if "" in node:
+            body = (body if len(alts) > 1 else "(?:" + body + ")") + "?"
+        return body
+    return emit(trie)
+
+class KeywordMatcher:
+    def __init__(self, table, plurals=True):
+        self.table = {label: list(words) for label, words in table.items()}
+        self.word_labels = {}
+        for label, words in self.table.items():
+            for w in words:
+                key = " ".join(w.lower().split())
+                labels = self.word_labels.setdefault(key, [])
+                if label not in labels: labels.append(label)
+        suffix = r"(?:e?s)?" if plurals else ""
+        self.pattern = re.compile(rf"\b({trie_pattern(self.word_labels)}){suffix}\b") if self.word_labels else None
+
+    def _labels_of(self, m):
+        return self.word_labels[" ".join(m.group(1).lower().split())]
+
+    def finditer(self, text):
+        if self.pattern is None:
+            return
+        for m in self.pattern.finditer(text.lower()):
+            for label in self._labels_of(m):
+                yield m.start(), label
+
+    def has(self, text, label):
+        return any(l == label for _, l in self.finditer(text))
+
+    def labels(self, text):
+        found = {}
+        for _, label in self.finditer(text):
+            found.setdefault(label, None)
+            if len(found) == len(self.table):
+                break
+        return list(found)
+
+    def labels_batch(self, texts):
+        return [self.labels(t) for t in texts]
+
+STORY_MATCHER = KeywordMatcher(load_table(os.environ.get("STORYTOGAME_KEYWORDS")))
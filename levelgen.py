@@ -0,0 +1,176 @@
+import sys, json, random, argparse
+
+GENERATOR_VERSION = 3   # bump when the same labels and seed produce different levels; keys cached campaigns
+
+DEFAULT_SPEC = {
+    "knight": {
+        "enemy_types": {
+            "snake": {"speed": 2, "hp": 1},
+            "hyena": {"speed": 3, "hp": 1},
+            "mummy": {"speed": 1, "hp": 3},
+        },
+        "biomes": {
+            "forest": {"name": "Forest", "bg": ["sky.png","pine.png","mountains.png"], "decor": ["tree.png","rock.png","bush.png"], "enemies": [["snake",3],["hyena",1]]},
+            "desert": {"name": "Desert", "bg": ["desert_bg.png"], "decor": ["cactus.png","ruins.png"], "enemies": [["hyena",3]]},
+            "graveyard": {"name": "Graveyard", "bg": ["graveyard_bg.png"], "decor": ["tombstone.png","dead_tree.png"], "enemies": [["mummy",2]]},
+            "castle": {"name": "Castle Gate", "bg": ["castle_bg.png","sky.png"], "decor": ["rock.png"], "enemies": [["hyena",2],["mummy",1]]},
+            "lava": {"name": "Lava Fields", "bg": ["lava_bg.png","desert_bg.png"], "decor": ["rock.png","ruins.png"], "enemies": [["snake",2],["hyena",2]]},
+        },
+        "default": ["forest","desert","graveyard"],
+        "labels": {
+            "forest": {"biome": "forest"}, "desert": {"biome": "desert"}, "graveyard": {"biome": "graveyard"},
+            "castle": {"biome": "castle"}, "lava": {"biome": "lava"},
+            "enemy": {"enemies": 1.5}, "treasure": {"enemies": 0.8},
+        },
+        "layout": {"start": 360, "group_gap": 220, "spacing": 60, "jitter": 40, "min_x": 200, "max_x": 760,
+                   "width": 960, "width_per_tier": 960, "max_width": 7680, "patrol": 320},
+        "ramp": 0.25,
+        "max_enemies": 12,
+    },
+    "space": {
+        "missions": {
+            "orbit": {"name": "Outer Orbit", "bg": ["space_bg.png","nebula_bg.png"], "waves": [{"type":"alien","count":6,"speed":2,"hp":1,"pattern":"straight"}]},
+            "asteroids": {"name": "Asteroid Belt", "bg": ["asteroid_bg.png","space_bg.png"], "waves": [{"type":"drone","count":5,"speed":3,"hp":2,"pattern":"zig"},{"type":"alien","count":4,"speed":2,"hp":1}]},
+            "boss": {"name": "Deep Space", "bg": ["nebula_bg.png","space_bg.png"], "waves": [{"type":"boss","count":1,"speed":1,"hp":10,"pattern":"straight"}]},
+        },
+        "default": ["orbit","asteroids","boss"],
+        "labels": {"enemy": {"enemies": 1.5}, "treasure": {"enemies": 0.8}, "lava": {"speed": 1}},
+        "ramp": 0.25,
+        "max_count": 40,
+    },
+}
+
+def load_spec(path=None):
+    if not path:
+        return DEFAULT_SPEC
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def label_effects(mode_spec, labels):
+    keys = []; enemies = 1.0; speed = 0
+    for label in labels:
+        fx = mode_spec["labels"].get(label, {})
+        if "biome" in fx and fx["biome"] not in keys: keys.append(fx["biome"])
+        enemies *= fx.get("enemies", 1.0); speed += fx.get("speed", 0)
+    return keys, enemies, speed
+
+def knight_level(m, key, tier, scale, rng):
+    biome = m["biomes"][key]; lay = m["layout"]; types = m["enemy_types"]
+    growth = scale * (1 + m["ramp"] * tier)
+    base = lay.get("width", 960)
+    width = min(lay.get("max_width", base), base + lay.get("width_per_tier", 0) * tier)
+    screens = width / base
+    spawns = []; x = lay["start"]; total = 0
+    # wide levels spread each enemy group over its own stretch of the world and patrol around their spawn
+    end = width - (base - lay["max_x"]); stretch = (end - lay["start"]) / max(1, len(biome["enemies"]))
+    for g, (typ, count) in enumerate(biome["enemies"]):
+        n = max(1, round(count * growth * screens)) if count else 0
+        n = min(n, int(m["max_enemies"] * screens) - total); total += n
+        stats = types.get(typ, {"speed": 1, "hp": 1})
+        for i in range(n):
+            spawn = {"type": typ, "speed": stats["speed"], "hp": stats["hp"] + tier // 2}
+            if width > base:
+                sx = round(lay["start"] + g * stretch + (i + 0.5) * stretch / n) + rng.randint(-lay["jitter"], lay["jitter"])
+                sx = min(end, max(lay["min_x"], sx))
+                spawn["patrol"] = [max(100, sx - lay["patrol"]), min(width - 140, sx + lay["patrol"])]
+            else:
+                sx = x + i * lay["spacing"]
+                if tier or scale != 1.0:
+                    sx = min(lay["max_x"], max(lay["min_x"], sx + rng.randint(-lay["jitter"], lay["jitter"])))
+            spawn["x"] = sx
+            spawns.append(spawn)
+        x += lay["group_gap"]
+    name = biome["name"] if not tier else f"{biome['name']} {tier + 1}"
+    return {"mode": "knight", "biome": key, "name": name, "bg": biome["bg"], "decor": biome["decor"],
+            "enemies": [[t, c] for t, c in biome["enemies"]], "width": width, "spawns": spawns}
+
+def space_mission(m, key, tier, scale, speed_bonus):
+    mission = m["missions"][key]
+    growth = scale * (1 + m["ramp"] * tier)
+    waves = []
+    for w in mission["waves"]:
+        w = dict(w)
+        w["count"] = min(m["max_count"], max(1, round(w.get("count", 5) * growth)))
+        w["speed"] = w.get("speed", 2) + speed_bonus + tier // 2
+        w["hp"] = w.get("hp", 1) + tier // 3
+        waves.append(w)
+    name = mission["name"] if not tier else f"{mission['name']} {tier + 1}"
+    return {"mode": "space", "mission": key, "name": name, "bg": mission["bg"], "waves": waves}
+
+def iter_levels(mode, labels=(), length=None, seed=0, spec=None):
+    m = (spec or DEFAULT_SPEC)[mode]
+    rng = random.Random(seed)
+    keys, scale, speed = label_effects(m, labels)
+    if mode == "space" or not keys:
+        keys = list(m["default"])
+    elif length is None:
+        # a curated campaign plays its biomes in the spec's order, as the hand-made one did; others follow in story order
+        keys.sort(key=lambda k: m["default"].index(k) if k in m["default"] else len(m["default"]))
+    visits = {}
+    for i in range(len(keys) if length is None else length):
+        # every visit to a biome/mission is one tier harder than the last, so generated levels never repeat a name
+        key = keys[i] if i < len(keys) else rng.choice(keys)
+        tier = visits.get(key, 0); visits[key] = tier + 1
+        if mode == "knight":
+            yield knight_level(m, key, tier, scale, rng)
+        else:
+            yield space_mission(m, key, tier, scale, speed)
+
+def iter_timeline(mode, segments, length=None, seed=0, spec=None):
+    # one knight level per timeline segment (see timeline.py), in story order; a biome the story returns to comes back
+    # a tier harder, and each level's enemy scale comes from its own segment's labels rather than the whole story's
+    m = (spec or DEFAULT_SPEC)[mode]
+    segments = [s for s in segments if s["biome"] in m.get("biomes", {})]
+    if not segments:   # space missions have no biomes
+        yield from iter_levels(mode, (), length, seed, spec)
+        return
+    rng = random.Random(seed); visits = {}
+    for i in range(len(segments) if length is None else length):
+        seg = segments[i] if i < len(segments) else rng.choice(segments)
+        tier = visits.get(seg["biome"], 0); visits[seg["biome"]] = tier + 1
+        _, scale, _ = label_effects(m, seg["labels"])
+        yield knight_level(m, seg["biome"], tier, scale, rng)
+
+class LevelStream:
+    def __init__(self, factory, length, keep=2):
+        self.factory = factory; self.length = length; self.keep = keep
+        self.restart()
+    def restart(self):
+        self.it = iter(self.factory()); self.cache = {}; self.next_i = 0
+    def __len__(self):
+        return self.length
+    def __getitem__(self, i):
+        if not 0 <= i < self.length:
+            raise IndexError(i)
+        if i not in self.cache and i < self.next_i:
+            self.restart()
+        while self.next_i <= i:
+            self.cache[self.next_i] = next(self.it)
+            self.cache.pop(self.next_i - self.keep, None)
+            self.next_i += 1
+        return self.cache[i]
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Stream generated level specs as JSON lines")
+    ap.add_argument("--mode", choices=["knight", "space"], default="knight")
+    ap.add_argument("--labels", default="", help="comma separated labels, e.g. forest,castle,enemy")
+    ap.add_argument("--story", help="derive labels from a story with the keyword matcher and the model")
+    ap.add_argument("--levels", type=int, help="campaign length (default: one level per matched biome)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--spec", help="JSON spec file replacing the built-in one")
+    args = ap.parse_args(argv)
+
+    labels = [l for l in args.labels.split(",") if l]
+    if args.story:
+        from keywords import STORY_MATCHER
+        from classifier import StoryClassifier
+        labels += STORY_MATCHER.labels(args.story)
+        clf = StoryClassifier()
+        if clf.load():
+            labels += clf.predict([args.story])[0][0]
+    for level in iter_levels(args.mode, labels, args.levels, args.seed, load_spec(args.spec)):
+        sys.stdout.write(json.dumps(level) + "\n")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+import os, re, sys, json, argparse
+import numpy as np
+
+NPZ_PATH = "story_model.npz"
+
+class NumpyScorer:
+    # TF-IDF transform and per-label logistic regression from plain arrays, so the game never unpickles sklearn objects
+    def __init__(self, vocab, idf, coef, intercept, labels, token_pattern=r"(?u)\b\w\w+\b", lowercase=True, norm="l2", source=None):
+        self.source=source or {}
+        self.vocab = {w: i for i, w in enumerate(vocab)}
+        self.idf=np.asarray(idf, np.float64); self.coef=np.asarray(coef, np.float64); self.intercept=np.asarray(intercept, np.float64)
+        self.labels=list(labels); self.token=re.compile(token_pattern); self.lowercase=lowercase; self.norm=norm
+
+    @classmethod
+    def load(cls, path=NPZ_PATH):
+        with np.load(path, allow_pickle=False) as z:
+            meta = json.loads(str(z["meta"]))
+            return cls(z["vocab"].tolist(), z["idf"], z["coef"], z["intercept"], meta["labels"],
+                       meta["token_pattern"], meta["lowercase"], meta["norm"], meta.get("source"))
+
+    def save(self, path=NPZ_PATH):
+        vocab = sorted(self.vocab, key=self.vocab.get)
+        meta = {"labels": self.labels, "token_pattern": self.token.pattern, "lowercase": self.lowercase, "norm": self.norm, "source": self.source}
+        with open(path, "wb") as f:
+            np.savez_compressed(f, vocab=np.array(vocab), idf=self.idf, coef=self.coef, intercept=self.intercept, meta=np.array(json.dumps(meta)))
+
+    def transform(self, stories):
+        # sparse rows as (row of each entry, feature ids, tf-idf weights)
+        ids = []; lengths = []; vocab = self.vocab; findall = self.token.findall
+        for text in stories:
+            found = [vocab[t] for t in findall(text.lower() if self.lowercase else text) if t in vocab]
+            ids += found; lengths.append(len(found))
+        n = len(self.idf)
+        key = np.repeat(np.arange(len(stories), dtype=np.int64) * n, lengths) + np.array(ids, np.int64)
+        # one entry per (row, feature) with its count, as CountVectorizer would produce
+        key, counts = np.unique(key, return_counts=True)
+        rows = key // n; ids = key % n
+        w = counts * self.idf[ids]
+        if self.norm == "l2":
+            norms = np.sqrt(np.bincount(rows, weights=w * w, minlength=len(stories)))
+            w = w / np.where(norms > 0, norms, 1.0)[rows]
+        elif self.norm == "l1":
+            norms = np.bincount(rows, weights=np.abs(w), minlength=len(stories))
+            w = w / np.where(norms > 0, norms, 1.0)[rows]
+        return rows, ids, w
+
+    def decision_function(self, stories):
+        rows, ids, w = self.transform(stories)
+        scores = np.empty((len(stories), len(self.labels)))
+        for j in range(len(self.labels)):
+            scores[:, j] = np.bincount(rows, weights=w * self.coef[j, ids], minlength=len(stories))
+        return scores + self.intercept
+
+    def predict_proba(self, stories):
+        return 1.0 / (1.0 + np.exp(-self.decision_function(stories)))
+
+def export(model_path, vect_path, mlb_path, out=NPZ_PATH):
+    import joblib
+    from storycache import file_digest
+    vect = joblib.load(vect_path); model = joblib.load(model_path)
+    if getattr(vect, "analyzer", None) != "word" or vect.ngram_range != (1, 1) or vect.tokenizer or vect.preprocessor \
+            or vect.strip_accents or vect.sublinear_tf or not vect.use_idf:
+        raise ValueError("only word unigram TfidfVectorizer settings are supported for export")
+    estimators = getattr(model, "estimators_", None)
+    if not estimators or any(getattr(e, "coef_", None) is None or e.coef_.shape[0] != 1 for e in estimators):
+        raise ValueError("expected a MultiOutputClassifier of binary linear classifiers")
+    labels = [str(c) for c in joblib.load(mlb_path).classes_] if os.path.exists(mlb_path) else [str(j) for j in range(len(estimators))]
+    vocab = sorted(vect.vocabulary_, key=vect.vocabulary_.get)
+    coef = np.vstack([e.coef_[0] for e in estimators]); intercept = np.array([e.intercept_[0] for e in estimators])
+    source = {"model": file_digest(model_path), "vectorizer": file_digest(vect_path), "mlb": file_digest(mlb_path)}
+    scorer = NumpyScorer(vocab, vect.idf_, coef, intercept, labels, vect.token_pattern, vect.lowercase, vect.norm, source)
+    scorer.save(out)
+    return scorer, vect, model
+
+def main(argv=None):
+    from classifier import MODEL_PATH, VECT_PATH, MLB_PATH
+    ap = argparse.ArgumentParser(description="Export the joblib vectorizer and model to a NumPy-only .npz scorer")
+    ap.add_argument("--model", default=MODEL_PATH)
+    ap.add_argument("--vectorizer", default=VECT_PATH)
+    ap.add_argument("--mlb", default=MLB_PATH)
+    ap.add_argument("--out", default=NPZ_PATH)
+    ap.add_argument("--check", help="story file (one per line) to compare probabilities against sklearn")
+    args = ap.parse_args(argv)
+
+    scorer, vect, model = export(args.model, args.vectorizer, args.mlb, args.out)
+    print(f"Wrote {args.out}: {len(scorer.vocab)} terms x {len(scorer.labels)} labels ({os.path.getsize(args.out) // 1024} KB)")
+    stories = ["A knight walks through the forest, later crosses a desert and finds a tomb.",
+               "Aliens attack the mothership near the asteroid belt.", "The dragon guards treasure in a lava castle.", ""]
+    if args.check:
+        with open(args.check, encoding="utf-8") as f:
+            stories = [l.strip() for l in f if l.strip()]
+    ref = np.column_stack([p[:, -1] for p in model.predict_proba(vect.transform(stories))])
+    diff = float(np.abs(scorer.predict_proba(stories) - ref).max()) if stories else 0.0
+    print(f"max |p - sklearn p| over {len(stories)} stories: {diff:.3g}")
+    return 0 if diff < 1e-9 else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+import os, sys, gzip, json, time, argparse
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from keywords import STORY_MATCHER
+from classifier import StoryClassifier
+from levelgen import iter_levels, load_spec
+
+CATALOG_META = "catalog.json"
+
+def iter_stories(path, field="story"):
+    # one story per line, or one JSON object per line for .jsonl inputs; WritingPrompts' <newline> markers become spaces
+    opener = gzip.open if path.endswith(".gz") else open
+    as_json = ".jsonl" in path
+    f = sys.stdin if path == "-" else opener(path, "rt", encoding="utf-8", errors="replace")
+    with f:
+        for line in f:
+            line = line.strip()
+            if not line: continue
+            if as_json:
+                try: line = json.loads(line).get(field) or ""
+                except ValueError: continue
+            line = " ".join(line.replace("<newline>", " ").split())
+            if line:
+                yield line
+
+def iter_shards(stories, size):
+    shard = []
+    for text in stories:
+        shard.append(text)
+        if len(shard) >= size:
+            yield shard; shard = []
+    if shard:
+        yield shard
+
+def shard_path(out, k):
+    return os.path.join(out, f"shard-{k:06d}.jsonl.gz")
+
+WORKER = {}
+
+def init_worker(spec_path, levels, seed):
+    clf = StoryClassifier(); clf.load()
+    WORKER.update(clf=clf, spec=load_spec(spec_path), levels=levels, seed=seed)
+
+def build_shard(out, k, first, stories):
+    clf = WORKER["clf"]; spec = WORKER["spec"]
+    path = shard_path(out, k); tmp = path + ".tmp"; modes = {}
+    with gzip.open(tmp, "wt", encoding="utf-8", compresslevel=6) as f:
+        for i, (text, res) in enumerate(zip(stories, clf.classify_batch(stories)), first):
+            labels = STORY_MATCHER.labels(text) + res["labels"]
+            levels = list(iter_levels(res["mode"], labels, WORKER["levels"], WORKER["seed"] + i, spec))
+            f.write(json.dumps({"id": i, "mode": res["mode"], "source": res["source"], "labels": labels, "levels": levels},
+                               separators=(",", ":")) + "\n")
+            modes[res["mode"]] = modes.get(res["mode"], 0) + 1
+    os.replace(tmp, path)
+    return k, len(stories), modes
+
+def iter_catalog(out):
+    k = 0
+    while os.path.exists(shard_path(out, k)):
+        with gzip.open(shard_path(out, k), "rt", encoding="utf-8") as f:
+            for line in f:
+                yield json.loads(line)
+        k += 1
+
+def check_meta(out, meta):
+    path = os.path.join(out, CATALOG_META)
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            old = json.load(f)
+        changed = [k for k in meta if old.get(k) != meta[k]]
+        if changed:
+            raise SystemExit(f"{out} was built with different settings ({', '.join(changed)}); use a new --out directory")
+        return
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=1)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Pre-generate level specs for a story corpus into resumable gzip JSONL shards")
+    ap.add_argument("input", help="story corpus: one story per line (.txt, .wp_target) or JSON lines (.jsonl), optionally .gz; '-' for stdin")
+    ap.add_argument("--out", default="catalog", help="output directory")
+    ap.add_argument("--field", default="story", help="story field for .jsonl inputs")
+    ap.add_argument("--shard-size", type=int, default=2048, help="stories per shard (and per classifier batch)")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--levels", type=int, default=6, help="levels generated per story")
+    ap.add_argument("--level-seed", type=int, default=0, help="story i uses level seed + i")
+    ap.add_argument("--spec", help="JSON level spec replacing the built-in one (see levelgen.py)")
+    ap.add_argument("--limit", type=int, help="stop after this many stories")
+    args = ap.parse_args(argv)
+
+    os.makedirs(args.out, exist_ok=True)
+    check_meta(args.out, {"input": os.path.basename(args.input), "field": args.field, "shard_size": args.shard_size,
+                          "levels": args.levels, "level_seed": args.level_seed, "spec": args.spec})
+    stories = iter_stories(args.input, args.field)
+    if args.limit:
+        stories = (s for i, s in zip(range(args.limit), stories))
+    written = skipped = total = 0; modes = {}
+    t0 = time.perf_counter()
+    def collect(done):
+        nonlocal written, total
+        for fut in done:
+            k, n, m = fut.result()
+            written += 1; total += n
+            for mode, c in m.items(): modes[mode] = modes.get(mode, 0) + c
+        print(f"\r{written} shards written, {skipped} already done, {total} stories "
+              f"({total / max(1e-9, time.perf_counter() - t0):.0f}/s)", end="", file=sys.stderr)
+    # at most two shards per worker are in flight, so memory stays flat however large the corpus is
+    with ProcessPoolExecutor(args.workers, initializer=init_worker, initargs=(args.spec, args.levels, args.level_seed)) as pool:
+        inflight = set(); first = 0
+        for k, shard in enumerate(iter_shards(stories, args.shard_size)):
+            if os.path.exists(shard_path(args.out, k)):
+                skipped += 1
+            else:
+                if len(inflight) >= 2 * args.workers:
+                    done, inflight = wait(inflight, return_when=FIRST_COMPLETED)
+                    collect(done)
+                inflight.add(pool.submit(build_shard, args.out, k, first, shard))
+            first += len(shard)
+        collect(wait(inflight).done)
+    print(file=sys.stderr)
+    print(json.dumps({"out": args.out, "shards_written": written, "shards_skipped": skipped, "stories": total,
+                      "modes": modes, "seconds": round(time.perf_counter() - t0, 2)}))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
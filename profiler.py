@@ -0,0 +1,97 @@
+import os, csv, json, time, cProfile, pstats
+from collections import deque
+
+PHASES = ("event", "update", "collide", "draw", "flip")
+
+class FrameProfiler:
+    def __init__(self, trace_path=None, overlay=False, window=120, profile_dir="profiles"):
+        self.trace_path=trace_path; self.overlay=overlay; self.profile_dir=profile_dir
+        self.enabled = bool(trace_path) or overlay
+        self.window = deque(maxlen=window)
+        self.frame=0; self.times={}; self.t0=self.last=0.0
+        self.trace=None; self.writer=None; self.profile=None
+
+    def configure(self, trace_path=None, overlay=False, profile_dir=None):
+        self.close()
+        self.__init__(trace_path, overlay, self.window.maxlen, profile_dir or self.profile_dir)
+
+    def begin(self):
+        if not self.enabled: return
+        self.times = dict.fromkeys(PHASES, 0.0)
+        self.t0 = self.last = time.perf_counter()
+
+    def lap(self, phase):
+        if not self.enabled: return
+        now = time.perf_counter()
+        self.times[phase] += (now - self.last) * 1000.0; self.last = now
+
+    def end_frame(self, counts=None):
+        if not self.enabled: return
+        row = {"frame": self.frame, "ms": (time.perf_counter() - self.t0) * 1000.0, **self.times, **(counts or {})}
+        self.frame += 1; self.window.append(row)
+        if self.trace_path:
+            self.write(row)
+
+    def write(self, row):
+        if self.trace is None:
+            self.trace = open(self.trace_path, "w+", newline="", encoding="utf-8"); self.fields = []
+        row = {k: round(v, 4) if isinstance(v, float) else v for k, v in row.items()}
+        if self.trace_path.endswith(".jsonl"):
+            self.trace.write(json.dumps(row) + "\n"); return
+        new = [k for k in row if k not in self.fields]
+        if new:
+            # a column first seen mid-run (another mode's counts, audio voices, ...) widens the header: the rows so far
+            # are rewritten under it with the new columns left empty
+            self.fields += new
+            self.trace.seek(0); old = list(csv.DictReader(self.trace))
+            self.trace.seek(0); self.trace.truncate()
+            self.writer = csv.DictWriter(self.trace, fieldnames=self.fields, restval="")
+            self.writer.writeheader(); self.writer.writerows(old)
+        self.writer.writerow(row)
+
+    def averages(self):
+        if not self.window:
+            return {}
+        keys = [k for k, v in self.window[-1].items() if k != "frame" and isinstance(v, (int, float))]
+        return {k: sum(r.get(k, 0) for r in self.window) / len(self.window) for k in keys}
+
+    def overlay_lines(self):
+        avg = self.averages()
+        if not avg:
+            return []
+        fps = 1000.0 / avg["dt"] if avg.get("dt") else 0.0
+        counts = [k for k in avg if k not in PHASES and k not in ("ms", "dt", "cache_hit_rate", "cache_mb")]
+        lines = [f"fps {fps:5.1f}  work {avg['ms']:5.2f} ms",
+                 "  ".join(f"{p} {avg[p]:.2f}" for p in PHASES)]
+        if counts:
+            lines.append("  ".join(f"{k} {avg[k]:.0f}" for k in counts))
+        if "cache_hit_rate" in avg:
+            lines.append(f"cache hit {avg['cache_hit_rate']*100:.1f}%  {avg.get('cache_mb', 0):.1f} MB")
+        if self.profile is not None:
+            lines.append("cProfile recording (F9 to stop)")
+        return lines
+
+    def toggle_overlay(self):
+        self.overlay = not self.overlay
+        self.enabled = bool(self.trace_path) or self.overlay
+        return self.overlay
+
+    def toggle_cprofile(self, top=20):
+        if self.profile is None:
+            self.profile = cProfile.Profile(); self.profile.enable()
+            print("cProfile sampling started (F9 to stop).")
+            return None
+        self.profile.disable()
+        os.makedirs(self.profile_dir, exist_ok=True)
+        path = os.path.join(self.profile_dir, time.strftime("profile-%Y%m%d-%H%M%S.prof"))
+        self.profile.dump_stats(path)
+        pstats.Stats(self.profile).sort_stats("cumulative").print_stats(top)
+        print("cProfile stats written to", path)
+        self.profile = None
+        return path
+
+    def close(self):
+        if self.profile is not None:
+            self.toggle_cprofile()
+        if self.trace is not None:
+            self.trace.close(); self.trace = None; self.writer = None
@@ -0,0 +1,48 @@
+import json, zlib, struct
+
+MAGIC = b"STGR"
+VERSION = 1
+RUN = struct.Struct("<HBH")   # frames in the run, key bitmask, frame dt in ms
+
+# file layout: MAGIC, version byte, u32 header length, JSON header, then zlib-compressed runs of identical (mask, dt) frames
+class Recorder:
+    def __init__(self, path, header):
+        self.path=path; self.header=dict(header)
+        self.runs=bytearray(); self.last=None; self.count=0; self.ticks=0; self.closed=False
+    def frame(self, mask, dt):
+        dt = min(int(dt), 0xFFFF); self.ticks += 1
+        if (mask, dt) == self.last and self.count < 0xFFFF:
+            self.count += 1
+            return
+        self.flush_run(); self.last = (mask, dt); self.count = 1
+    def flush_run(self):
+        if self.count:
+            self.runs += RUN.pack(self.count, *self.last)
+    def close(self, **final):
+        if self.closed:
+            return
+        self.closed = True; self.flush_run()
+        header = json.dumps({**self.header, "ticks": self.ticks, "final": final}).encode("utf-8")
+        with open(self.path, "wb") as f:
+            f.write(MAGIC + bytes([VERSION]) + struct.pack("<I", len(header)) + header)
+            f.write(zlib.compress(bytes(self.runs), 9))
+        print(f"Replay saved to {self.path} ({self.ticks} frames)")
+
+class Replay:
+    def __init__(self, header, runs):
+        self.header=header; self.runs=runs
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        if data[:4] != MAGIC or data[4] != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} StoryToGame replay")
+        (n,) = struct.unpack_from("<I", data, 5)
+        header = json.loads(data[9:9 + n].decode("utf-8"))
+        return cls(header, [RUN.unpack_from(raw, i) for raw in [zlib.decompress(data[9 + n:])] for i in range(0, len(raw), RUN.size)])
+    def __len__(self):
+        return self.header.get("ticks", sum(c for c, _, _ in self.runs))
+    def frames(self):
+        for count, mask, dt in self.runs:
+            for _ in range(count):
+                yield mask, dt
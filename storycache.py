@@ -0,0 +1,115 @@
+import os, json, time, sqlite3, hashlib, threading
+from collections import OrderedDict
+
+CACHE_PATH = os.environ.get("STORYTOGAME_STORY_CACHE", "story_cache.sqlite")
+
+def normalize(text):
+    return " ".join(text.lower().split())
+
+def story_key(text, *parts):
+    h = hashlib.sha1(normalize(text).encode("utf-8"))
+    for p in parts:
+        h.update(b"\0" + str(p).encode("utf-8"))
+    return h.hexdigest()
+
+def digest(obj):
+    return hashlib.sha1(json.dumps(obj, sort_keys=True).encode("utf-8")).hexdigest()
+
+def file_digest(path):
+    if not os.path.exists(path):
+        return "-"
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+class StoryCache:
+    # LRU dict in front of an sqlite table; keys already carry the model fingerprint, so stale rows are never hit and age out.
+    # The file is opened on first use, so constructing a cache (e.g. when the app is imported) touches nothing on disk.
+    # A failing sqlite call (a locked file under concurrent writers, a read-only directory) only costs a miss or a write.
+    def __init__(self, path=CACHE_PATH, max_items=4096, max_disk=200000):
+        self.path=path; self.max_items=max_items; self.max_disk=max_disk
+        self.items=OrderedDict(); self.lock=threading.Lock(); self.db=None; self.opened=False
+        self.hits=0; self.disk_hits=0; self.misses=0; self.writes=0; self.errors=0
+
+    def connect(self):
+        if self.db is None and self.path and not self.opened:
+            try:
+                self.db = sqlite3.connect(self.path, timeout=1.0, check_same_thread=False)
+                self.db.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value TEXT, used REAL)")
+                self.db.execute("CREATE INDEX IF NOT EXISTS entries_used ON entries (used)")
+                self.opened = True
+            except sqlite3.Error as e:
+                if self.db is not None:
+                    self.db.close(); self.db = None
+                if "locked" in str(e) or "busy" in str(e):
+                    self.failed(e)   # another process is writing; try again on the next call
+                else:
+                    print("Story cache unavailable, keeping it in memory only:", e); self.opened = True
+        return self.db
+
+    def failed(self, e):
+        self.errors += 1
+        if self.errors == 1:
+            print("Story cache access failed; treating it as a miss:", e)
+        if self.db is not None:
+            try: self.db.rollback()
+            except sqlite3.Error: pass
+
+    def remember(self, key, value):
+        self.items[key] = value; self.items.move_to_end(key)
+        while len(self.items) > self.max_items:
+            self.items.popitem(last=False)
+
+    def get(self, key):
+        with self.lock:
+            if key in self.items:
+                self.items.move_to_end(key); self.hits += 1
+                return self.items[key]
+            db = self.connect(); row = None
+            if db is not None:
+                try: row = db.execute("SELECT value FROM entries WHERE key=?", (key,)).fetchone()
+                except sqlite3.Error as e: self.failed(e)
+            if row is None:
+                self.misses += 1
+                return None
+            value = json.loads(row[0]); self.disk_hits += 1
+            self.remember(key, value)
+            try:
+                db.execute("UPDATE entries SET used=? WHERE key=?", (time.time(), key)); db.commit()
+            except sqlite3.Error as e:
+                self.failed(e)
+            return value
+
+    def put_many(self, pairs):
+        with self.lock:
+            for key, value in pairs:
+                self.remember(key, value)
+            db = self.connect() if pairs else None
+            if db is None:
+                return
+            now = time.time()
+            try:
+                db.executemany("INSERT OR REPLACE INTO entries VALUES (?,?,?)", [(k, json.dumps(v), now) for k, v in pairs])
+                self.writes += len(pairs)
+                if self.writes >= self.max_disk // 10:
+                    self.writes = 0
+                    db.execute("DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY used DESC LIMIT -1 OFFSET ?)", (self.max_disk,))
+                db.commit()
+            except sqlite3.Error as e:
+                self.failed(e)
+
+    def put(self, key, value):
+        self.put_many([(key, value)])
+
+    def stats(self):
+        total = self.hits + self.disk_hits + self.misses
+        return {"items": len(self.items), "hits": self.hits, "disk_hits": self.disk_hits, "misses": self.misses,
+                "hit_rate": (self.hits + self.disk_hits) / total if total else 0.0, "errors": self.errors,
+                "path": self.path if self.db else None}
+
+    def close(self):
+        with self.lock:
+            if self.db is not None:
+                self.db.close(); self.db = None
@@ -0,0 +1,4 @@
+import os, sys
+
+# the game's modules live at the repo root, next to "app(Vs code).py", rather than in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,58 @@
+import os, json, wave, struct
+import pytest
+import pygame
+from assetpack import AssetPack, build, stale_sources
+
+@pytest.fixture
+def tree(tmp_path):
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    pygame.mixer.init()
+    root = tmp_path / "assets"; (root / "knight" / "sfx").mkdir(parents=True)
+    img = pygame.Surface((5, 3), pygame.SRCALPHA); img.fill((10, 20, 30, 255)); img.set_at((4, 2), (200, 0, 0, 128))
+    pygame.image.save(img, str(root / "knight" / "tree.png"))
+    with wave.open(str(root / "knight" / "sfx" / "hit.wav"), "wb") as w:
+        w.setnchannels(1); w.setsampwidth(2); w.setframerate(22050)
+        w.writeframes(b"".join(struct.pack("<h", (i * 700) % 20000 - 10000) for i in range(2205)))
+    (root / "levels.json").write_text(json.dumps({"levels": [1, 2, 3]}), encoding="utf-8")
+    yield root, img
+    pygame.mixer.quit()
+
+def test_build_open_and_read_back(tree, tmp_path):
+    root, img = tree; out = str(tmp_path / "assets.pack")
+    extra = {"knight/castle.png": ({"kind": "image", "wh": [2, 2]}, bytes(range(16)))}
+    entries = build(str(root), out, extra)
+    assert sorted(entries) == ["knight/castle.png", "knight/sfx/hit.wav", "knight/tree.png", "levels.json"]
+    assert all(e["offset"] % 64 == 0 for e in entries.values())
+    pack = AssetPack.open(out)
+    try:
+        assert "knight/tree.png" in pack and "knight/missing.png" not in pack
+        surf = pack.image("knight/tree.png")
+        assert surf.get_size() == (5, 3)
+        assert pygame.image.tobytes(surf, "RGBA") == pygame.image.tobytes(img, "RGBA")
+        assert pack.data("levels.json") == (root / "levels.json").read_bytes()
+        assert pack.data("knight/castle.png") == bytes(range(16))
+        assert pack.audio_format == pygame.mixer.get_init()
+        sound = pack.sound("knight/sfx/hit.wav")
+        assert abs(sound.get_length() - 0.1) < 0.01
+        assert stale_sources(pack, str(root)) == []
+    finally:
+        del surf, sound
+        pack.close()
+
+def test_stale_sources_after_changes(tree, tmp_path):
+    root, _ = tree; out = str(tmp_path / "assets.pack")
+    build(str(root), out)
+    st = os.stat(root / "levels.json")
+    os.utime(root / "levels.json", ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    (root / "knight" / "sfx" / "hit.wav").unlink()
+    (root / "knight" / "rock.png").write_bytes(b"")
+    pack = AssetPack.open(out)
+    try:
+        assert stale_sources(pack, str(root)) == ["knight/rock.png", "knight/sfx/hit.wav", "levels.json"]
+    finally:
+        pack.close()
+
+def test_open_rejects_missing_and_foreign_files(tmp_path):
+    assert AssetPack.open(str(tmp_path / "none.pack")) is None
+    bad = tmp_path / "bad.pack"; bad.write_bytes(b"NOPE" + bytes(60))
+    assert AssetPack.open(str(bad)) is None
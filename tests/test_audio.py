@@ -0,0 +1,53 @@
+from audio import VoiceManager
+
+class StubChannel:
+    # a mixer channel that stays busy from play() until the test frees it
+    def __init__(self):
+        self.busy = False; self.played = []
+    def get_busy(self):
+        return self.busy
+    def play(self, sound):
+        self.busy = True; self.played.append(sound)
+
+def manager(voices, sounds):
+    # what init() sets up, with stub channels instead of the mixer; sounds: name -> (category, gap)
+    vm = VoiceManager(voices); first = 0
+    for category, n in voices.items():
+        vm.pools[category] = range(first, first + n); first += n
+    vm.channels = [StubChannel() for _ in range(first)]; vm.started = [0] * first
+    vm.sounds = {name: (name, vm.pools[cat], gap) for name, (cat, gap) in sounds.items()}
+    vm.enabled = True
+    return vm
+
+def test_triggers_within_a_frame_play_once():
+    vm = manager({"impact": 4}, {"explosion": ("impact", 0)})
+    for _ in range(5):
+        vm.trigger("explosion")
+    vm.flush(now=100)
+    assert sum(len(c.played) for c in vm.channels) == 1
+    assert vm.counts["triggered"] == 5 and vm.counts["deduped"] == 4 and vm.counts["played"] == 1
+
+def test_gap_throttles_repeats():
+    vm = manager({"player": 2}, {"laser": ("player", 60)})
+    for now in (0, 30, 59, 60, 100, 125):
+        vm.trigger("laser"); vm.flush(now=now)
+        for c in vm.channels: c.busy = False
+    assert vm.counts["played"] == 3 and vm.counts["throttled"] == 3   # at 0, 60 and 125
+
+def test_full_pool_steals_the_oldest_voice():
+    vm = manager({"impact": 2, "ui": 1}, {"a": ("impact", 0), "b": ("impact", 0), "c": ("impact", 0), "done": ("ui", 0)})
+    vm.trigger("a"); vm.flush(now=10)
+    vm.trigger("b"); vm.flush(now=20)
+    vm.trigger("c"); vm.flush(now=30)
+    impact = vm.channels[:2]
+    assert [c.played for c in impact] == [["a", "c"], ["b"]] and vm.counts["stolen"] == 1
+    assert vm.started[:2] == [30, 20] and vm.peak == 2
+    vm.trigger("done"); vm.flush(now=40)   # other categories keep their own voices
+    assert vm.channels[2].played == ["done"] and vm.counts["stolen"] == 1 and vm.busy() == 3
+
+def test_missing_sounds_and_disabled_manager():
+    vm = manager({"ui": 1}, {})
+    vm.trigger("level_complete"); vm.flush(now=0)
+    assert vm.counts["missing"] == 1 and vm.counts["played"] == 0
+    off = VoiceManager(); off.trigger("laser"); off.flush(now=0)
+    assert off.counts["triggered"] == 0 and off.telemetry() == {}
@@ -0,0 +1,58 @@
+import random
+import pytest
+from app_module import load_app
+from storycache import StoryCache
+
+@pytest.fixture(scope="module")
+def game():
+    app = load_app(); app.VERBOSE = False
+    app.classifier.cache = StoryCache(None)   # keep the test from writing story_cache.sqlite
+    return app.SpaceGame("A fleet of ships fights aliens in the nebula.")
+
+def rects_overlap(a, b):
+    return a[0] < b[0] + b[2] and a[0] + a[2] > b[0] and a[1] < b[1] + b[3] and a[1] + a[3] > b[1]
+
+def baseline(bullets, enemies, player, player_hp):
+    # the sprite-group rules: bullets in firing order each hit the earliest-spawned enemy still standing; enemies killed
+    # earlier in the frame are skipped; every surviving enemy touching the player dies and costs 1 HP
+    hp = [e[4] for e in enemies]; killed = set(); spent = set()
+    for i, b in enumerate(bullets):
+        for j, e in enumerate(enemies):
+            if j not in killed and rects_overlap(b, e):
+                hp[j] -= 1; spent.add(i)
+                if hp[j] <= 0: killed.add(j)
+                break
+    rammed = {j for j, e in enumerate(enemies) if j not in killed and rects_overlap(player, e)}
+    left = [e[:4] + (hp[j],) for j, e in enumerate(enemies) if j not in killed | rammed]
+    return [b for i, b in enumerate(bullets) if i not in spent], left, len(killed), player_hp - len(rammed)
+
+def scene(rng, n_bullets, n_enemies):
+    # everything crowded into a small area so bullets share targets and enemies pile onto the player
+    bullets = [(rng.randint(0, 150), rng.randint(-40, 150), 6, 12) for _ in range(n_bullets)]
+    enemies = [(rng.randint(0, 150), rng.randint(-40, 150), rng.choice((32, 36)), rng.choice((32, 36)), rng.randint(1, 3))
+               for _ in range(n_enemies)]
+    return bullets, enemies
+
+@pytest.mark.parametrize("n_bullets,n_enemies", [(5, 4), (12, 20), (60, 40), (200, 150)])
+def test_collide_matches_sprite_rules(game, n_bullets, n_enemies):
+    rng = random.Random(n_bullets * 7 + n_enemies)
+    for _ in range(25):
+        bullets, enemies = scene(rng, n_bullets, n_enemies)
+        game.bullets.clear(); game.enemies.clear()
+        for x, y, w, h in bullets:
+            game.bullets.add(x=x, y=y, w=w, h=h, vy=-10)
+        for x, y, w, h, hp in enemies:
+            game.enemies.add(x=x, y=y, w=w, h=h, hp=hp)
+        game.player.rect.topleft = (rng.randint(0, 150), rng.randint(0, 150)); game.player.hp = 10**6; game.kills = 0
+        player = tuple(game.player.rect)
+        want_bullets, want_enemies, want_kills, want_hp = baseline(bullets, enemies, player, game.player.hp)
+        assert game.collide() is None
+        assert game.bullets.rects() == want_bullets
+        assert list(zip(*[game.enemies.column(k) for k in ("x", "y", "w", "h", "hp")])) == want_enemies
+        assert (game.kills, game.player.hp) == (want_kills, want_hp)
+
+def test_collide_reports_death(game):
+    game.bullets.clear(); game.enemies.clear()
+    game.player.rect.topleft = (100, 100); game.player.hp = 1
+    game.enemies.add(x=100, y=100, w=32, h=32, hp=1)
+    assert game.collide() == "dead" and len(game.enemies) == 0
@@ -0,0 +1,74 @@
+import random
+import numpy as np
+import pygame
+import pytest
+from entities import EntityStore, SMALL_STORE
+
+FIELDS = {"hp": np.int32, "flip": np.bool_}
+
+def store(capacity=8):
+    return EntityStore(FIELDS, capacity)
+
+def fill(s, n, start=0):
+    s.extend(n, x=np.arange(start, start + n), y=-np.arange(start, start + n), w=2, h=3, hp=5, flip=True)
+
+def test_switches_to_arrays_and_back_keeping_rows():
+    s = store(); fill(s, SMALL_STORE)
+    assert s.lists is not None and s.stats()["backing"] == "lists"
+    fill(s, 1, SMALL_STORE)
+    assert s.lists is None and s.x.tolist() == list(range(SMALL_STORE + 1)) and s.y.tolist() == [-i for i in range(SMALL_STORE + 1)]
+    assert s.hp.tolist() == [5] * (SMALL_STORE + 1) and s.flip.all()
+    s.hp[3] = 1   # array mode hands out live views
+    keep = s.x % 3 == 0
+    s.compact(keep)
+    assert s.lists is not None and s.lists["x"] == list(range(0, SMALL_STORE + 1, 3))
+    assert s.lists["hp"] == [1 if x == 3 else 5 for x in s.lists["x"]] and s.lists["w"] == [2] * len(s)
+
+def test_compact_keeps_insertion_order_with_list_or_array_masks():
+    for masks in ([True, False] * 20, np.array([True, False] * 20)):
+        for n in (10, 40):
+            s = store(); fill(s, n)
+            assert s.compact(masks[:n]) == n // 2
+            assert s.column("x") == list(range(0, n, 2)) and s.column("y") == [-x for x in range(0, n, 2)]
+
+def test_list_mode_columns_are_read_only():
+    s = store(); fill(s, 4)
+    with pytest.raises(ValueError):
+        s.hp[0] -= 1
+    s.hp = [1, 2, 3, 4]
+    assert s.lists["hp"] == [1, 2, 3, 4] and s.hp.tolist() == [1, 2, 3, 4]
+
+def test_recycling_counts_array_slots_only():
+    s = store(); fill(s, 5); s.clear(); fill(s, 5)
+    st = s.stats()
+    assert st["recycled"] == 0 and st["capacity"] == 0 and st["spawned"] == 10 and st["freed"] == 5
+    fill(s, SMALL_STORE)                     # switches to arrays
+    s.compact(np.arange(len(s)) < SMALL_STORE - 2)
+    fill(s, 2)
+    st = s.stats()
+    assert st["backing"] == "arrays" and st["recycled"] == 2 and st["capacity"] >= len(s)
+
+def random_store(rng, n, big):
+    s = EntityStore({}, 4)
+    for _ in range(n):
+        w = rng.randint(1, big); h = rng.randint(1, big)
+        s.add(x=rng.randint(-50, 400), y=rng.randint(-300, 300), w=w, h=h)
+    return s
+
+def brute(a, b):
+    out = []
+    for i, r in enumerate(a.rects()):
+        found = [j for j, o in enumerate(b.rects()) if pygame.Rect(r).colliderect(pygame.Rect(o))]
+        if found:
+            out.append((i, found))
+    return out
+
+@pytest.mark.parametrize("na,nb", [(3, 5), (20, 30), (60, 200), (300, 40)])
+def test_hits_match_brute_force(na, nb):
+    rng = random.Random(na * 1000 + nb)
+    for _ in range(20):
+        a = random_store(rng, na, 40); b = random_store(rng, nb, 80)
+        assert list(a.hits(b)) == brute(a, b)
+        touching = [i for i, r in enumerate(b.rects()) if pygame.Rect(r).colliderect(pygame.Rect(0, -20, 100, 60))]
+        assert np.flatnonzero(b.overlaps(pygame.Rect(0, -20, 100, 60))).tolist() == touching
+        assert b.touching(pygame.Rect(0, -20, 100, 60)) == touching
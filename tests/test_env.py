@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+from env import GameEnv, OBS_SIZE
+from storycache import StoryCache
+
+@pytest.fixture(params=["knight", "space"])
+def env(request):
+    env = GameEnv(mode=request.param, max_ticks=50)
+    env.app.classifier.cache = StoryCache(None)   # keep the test from writing story_cache.sqlite
+    return env
+
+def rollout(env, seed, actions):
+    obs, _ = env.reset(seed=seed); out = [obs.copy()]
+    for a in actions:
+        obs, reward, done, truncated, info = env.step(a)
+        out.append(obs.copy())
+        if done or truncated:
+            break
+    return np.array(out), info
+
+def test_reset_and_step_shapes(env):
+    obs, info = env.reset(seed=0)
+    assert obs.shape == (OBS_SIZE,) and obs.dtype == np.float32 and info == {"level": 0}
+    obs, reward, done, truncated, info = env.step(0)
+    assert obs.shape == (OBS_SIZE,) and isinstance(reward, float) and not done and info["ticks"] == 1
+
+def test_truncates_at_max_ticks(env):
+    _, info = rollout(env, 0, [0] * 100)
+    assert info == {"outcome": "timeout", "level": 0, "ticks": 50}
+
+def test_same_seed_same_episode(env):
+    actions = [a % 64 for a in range(0, 400, 7)]
+    a, _ = rollout(env, 5, actions)
+    b, _ = rollout(env, 5, actions)
+    assert np.array_equal(a, b)
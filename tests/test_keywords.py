@@ -0,0 +1,27 @@
+from keywords import KeywordMatcher, STORY_MATCHER, trie_pattern
+import re
+
+def test_labels_in_mention_order():
+    assert STORY_MATCHER.labels("A knight finds a tomb, then crosses the desert and reaches a forest.") == ["graveyard", "desert", "forest"]
+
+def test_whole_words_only():
+    assert STORY_MATCHER.labels("The spacious treehouse stood on sandstone.") == []
+    assert STORY_MATCHER.has("Aliens attack the ship.", "space")
+
+def test_plurals_and_case():
+    assert STORY_MATCHER.labels("TREES and Dunes and graves") == ["forest", "desert", "graveyard"]
+    assert KeywordMatcher({"forest": ["tree"]}, plurals=False).labels("trees") == []
+
+def test_multi_word_keywords_and_shared_words():
+    m = KeywordMatcher({"space": ["space ship"], "ship": ["ship"], "sea": ["ship"]})
+    assert m.labels("the  space\nship landed") == ["space"]
+    assert m.labels("a ship") == ["ship", "sea"]
+
+def test_empty_table_matches_nothing():
+    assert KeywordMatcher({}).labels("forest desert") == []
+
+def test_trie_pattern_matches_exactly_its_words():
+    words = ["tomb", "tombs", "to", "tree"]
+    rx = re.compile(rf"^(?:{trie_pattern(words)})$")
+    assert all(rx.match(w) for w in words)
+    assert not any(rx.match(w) for w in ("t", "tom", "treed"))
@@ -0,0 +1,44 @@
+from levelgen import iter_levels, iter_timeline, LevelStream, DEFAULT_SPEC
+
+def names(levels):
+    return [l["name"] for l in levels]
+
+def test_curated_campaign_follows_spec_order():
+    # the story mentions graveyard, desert, forest; the curated campaign still plays forest -> desert -> graveyard
+    assert names(iter_levels("knight", ["graveyard", "desert", "forest"])) == ["Forest", "Desert", "Graveyard"]
+
+def test_no_biome_labels_plays_default_campaign():
+    default = [DEFAULT_SPEC["knight"]["biomes"][k]["name"] for k in DEFAULT_SPEC["knight"]["default"]]
+    assert names(iter_levels("knight", [])) == default
+    assert len(list(iter_levels("space", ["forest"]))) == len(DEFAULT_SPEC["space"]["default"])
+
+def test_same_seed_same_levels():
+    labels = ["desert", "lava", "enemy"]
+    for mode in ("knight", "space"):
+        assert list(iter_levels(mode, labels, 8, seed=3)) == list(iter_levels(mode, labels, 8, seed=3))
+    assert list(iter_levels("knight", labels, 8, seed=3)) != list(iter_levels("knight", labels, 8, seed=4))
+
+def test_generated_extension_escalates():
+    levels = list(iter_levels("knight", ["forest"], 4))
+    assert names(levels) == ["Forest", "Forest 2", "Forest 3", "Forest 4"]
+    assert [l["width"] for l in levels] == sorted(l["width"] for l in levels)
+
+def test_generated_levels_have_unique_escalating_names():
+    for labels, mode in ((["forest", "desert"], "knight"), (["forest", "desert", "graveyard"], "knight"), ([], "space")):
+        for seed in range(5):
+            got = names(iter_levels(mode, labels, 12, seed=seed))
+            assert len(set(got)) == len(got), got
+            for name in got:
+                base, _, tier = name.rpartition(" ")
+                if tier.isdigit() and int(tier) > 2:
+                    assert f"{base} {int(tier) - 1}" in got[:got.index(name)], got
+
+def test_stream_replays_the_same_levels():
+    stream = LevelStream(lambda: iter_levels("knight", ["desert"], 6, seed=1), 6)
+    first = [stream[i] for i in range(6)]
+    stream.restart()
+    assert [stream[i] for i in range(6)] == first == list(iter_levels("knight", ["desert"], 6, seed=1))
+
+def test_timeline_levels_follow_segments():
+    segments = [{"biome": b, "labels": []} for b in ("desert", "forest", "desert")]
+    assert names(iter_timeline("knight", segments)) == ["Desert", "Forest", "Desert 2"]
@@ -0,0 +1,24 @@
+import os
+import numpy as np
+import pytest
+from npmodel import NumpyScorer, export
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STORIES = ["A knight walks through the forest, later crosses a desert and finds a tomb.",
+           "Aliens attack the mothership near the asteroid belt.", "The dragon guards treasure in a lava castle.",
+           "forest forest FOREST", ""]
+
+def test_export_matches_sklearn(tmp_path):
+    pytest.importorskip("sklearn")
+    out = str(tmp_path / "model.npz")
+    scorer, vect, model = export(*(os.path.join(ROOT, f) for f in ("story_model.joblib", "vectorizer.joblib", "mlb.joblib")), out)
+    ref = np.column_stack([p[:, -1] for p in model.predict_proba(vect.transform(STORIES))])
+    assert np.abs(scorer.predict_proba(STORIES) - ref).max() < 1e-9
+    assert np.array_equal(NumpyScorer.load(out).predict_proba(STORIES), scorer.predict_proba(STORIES))
+
+def test_scores_without_sklearn():
+    scorer = NumpyScorer(["forest", "ship"], [1.0, 2.0], [[3.0, -3.0], [-3.0, 3.0]], [0.0, 0.0], ["forest", "space"])
+    p = scorer.predict_proba(["Forest trees", "a ship", "nothing here"])
+    assert p.shape == (3, 2)
+    assert p[0, 0] > 0.9 > p[0, 1] and p[1, 1] > 0.9 > p[1, 0]
+    assert np.allclose(p[2], 0.5)
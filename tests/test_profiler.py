@@ -0,0 +1,15 @@
+import csv
+from profiler import FrameProfiler, PHASES
+
+def test_csv_trace_widens_for_late_columns(tmp_path):
+    path = str(tmp_path / "trace.csv")
+    prof = FrameProfiler(path)
+    for i in range(4):
+        prof.begin(); prof.lap("update")
+        prof.end_frame({"dt": 16, **({"bullets": i} if i >= 2 else {})})
+    prof.close()
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert [r["frame"] for r in rows] == ["0", "1", "2", "3"]
+    assert list(rows[0]) == ["frame", "ms", *PHASES, "dt", "bullets"]
+    assert [r["bullets"] for r in rows] == ["", "", "2", "3"]
@@ -0,0 +1,27 @@
+from replay import Recorder, Replay
+
+def test_record_replay_round_trip(tmp_path):
+    path = str(tmp_path / "run.stgr")
+    frames = [(0, 16), (0, 16), (2, 17), (2, 17), (2, 17), (9, 16)] + [(1, 16)] * 70000
+    rec = Recorder(path, {"mode": "knight", "story": "A knight.", "seed": 7, "timeline": [{"biome": "forest"}]})
+    for mask, dt in frames:
+        rec.frame(mask, dt)
+    rec.close(outcome="win", level=2)
+    replay = Replay.load(path)
+    assert list(replay.frames()) == frames and len(replay) == len(frames)
+    assert replay.header["seed"] == 7 and replay.header["timeline"] == [{"biome": "forest"}]
+    assert replay.header["final"] == {"outcome": "win", "level": 2}
+
+def test_close_is_idempotent(tmp_path):
+    path = str(tmp_path / "run.stgr")
+    rec = Recorder(path, {"seed": 1}); rec.frame(3, 16); rec.close(outcome="dead")
+    rec.frame(4, 16); rec.close(outcome="win")
+    assert list(Replay.load(path).frames()) == [(3, 16)]
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "not.stgr"; path.write_bytes(b"PNG\0garbage")
+    try:
+        Replay.load(str(path))
+    except ValueError:
+        return
+    assert False, "expected ValueError"
@@ -0,0 +1,62 @@
+import pytest
+from app_module import load_app
+
+class FakeControls:
+    def __init__(self, quit_after=None):
+        self.dts = []; self.quit_after = quit_after
+    def read(self, dt):
+        if self.quit_after is not None and len(self.dts) >= self.quit_after:
+            return None, dt
+        self.dts.append(dt)
+        return "keys", dt
+
+class FakeGame:
+    # counts ticks; step() returns `result` on tick number `result_at`
+    def __init__(self, result_at=None, result="complete", quit_after=None):
+        self.controls = FakeControls(quit_after); self.ticks = 0; self.remembered = 0
+        self.result_at = result_at; self.result = result
+    def remember(self):
+        self.remembered += 1
+    def step(self, keys, dt):
+        self.ticks += 1
+        return self.result if self.ticks == self.result_at else None
+
+@pytest.fixture(scope="module")
+def app():
+    return load_app()
+
+def test_real_time_frames_tick_at_60_hz(app):
+    clock = app.SimClock(max_skip=5); game = FakeGame()
+    for _ in range(600):
+        assert clock.advance(game, 1000 / 60) is None
+        assert 0 <= clock.alpha() < 1
+    dts = game.controls.dts
+    assert len(dts) in (599, 600) and set(dts) <= {16, 17}
+    # whole-ms steps add up to exactly 1000 ms per 60 ticks
+    assert all(sum(dts[i:i + 60]) == 1000 for i in range(0, len(dts) - 59, 60))
+    assert game.remembered == game.ticks == len(dts) and clock.dropped == 0
+
+def test_odd_frame_times_keep_the_tick_rate(app):
+    clock = app.SimClock(max_skip=5); game = FakeGame()
+    for i in range(300):
+        clock.advance(game, (7, 33, 16, 10)[i % 4])
+    assert abs(game.ticks - 300 * 66 / 4 / app.TICK_MS) <= 1 and clock.dropped == 0
+
+def test_long_frame_drops_the_backlog(app):
+    clock = app.SimClock(max_skip=5); game = FakeGame()
+    clock.advance(game, 1000)
+    assert game.ticks == 5
+    assert clock.dropped == 60 - 5   # 1000 ms is 60 ticks' worth; the 5 allowed ran, the rest are dropped
+    assert 0 <= clock.acc < clock.step
+    clock.advance(game, clock.step)
+    assert game.ticks == 6
+
+def test_level_result_resets_the_backlog(app):
+    clock = app.SimClock(max_skip=10); game = FakeGame(result_at=2)
+    assert clock.advance(game, 100) == "complete"
+    assert game.ticks == 2 and clock.acc == 0 and clock.alpha() == 0
+
+def test_quit_stops_without_a_step(app):
+    clock = app.SimClock(max_skip=5); game = FakeGame(quit_after=1)
+    assert clock.advance(game, 50) == "quit"
+    assert game.ticks == 1
@@ -0,0 +1,31 @@
+import os, sqlite3
+from storycache import StoryCache, story_key
+
+def test_key_ignores_case_and_spacing():
+    assert story_key("A  Knight\n", "knight", 1) == story_key("a knight", "knight", 1) != story_key("a knight", "knight", 2)
+
+def test_opens_lazily_and_persists(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = StoryCache(path)
+    assert not os.path.exists(path)
+    cache.put("k", {"mode": "knight"}); cache.close()
+    again = StoryCache(path)
+    assert again.get("k") == {"mode": "knight"} and again.disk_hits == 1
+    assert again.get("missing") is None and again.misses == 1
+
+def test_memory_lru_evicts_oldest():
+    cache = StoryCache(None, max_items=2)
+    cache.put("a", 1); cache.put("b", 2); cache.get("a"); cache.put("c", 3)
+    assert list(cache.items) == ["a", "c"]
+
+def test_locked_database_is_a_miss(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    StoryCache(path).put("k", 1)
+    other = sqlite3.connect(path); other.execute("BEGIN EXCLUSIVE")
+    try:
+        cache = StoryCache(path)
+        assert cache.get("k") is None
+        cache.put("j", 2)
+        assert cache.get("j") == 2 and cache.errors >= 1
+    finally:
+        other.rollback(); other.close()
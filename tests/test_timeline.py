@@ -0,0 +1,48 @@
+from keywords import STORY_MATCHER
+from levelgen import iter_timeline
+from timeline import iter_windows, analyze, compress
+
+FOREST = "The knight walked through the green forest among tall trees and quiet woods."
+DESERT = "The burning desert sand stretched to the dunes under a fire of a sun."
+LAVA = "Rivers of lava glowed red and fire burst from the cracked ground."
+FILLER = "He kept moving and thought about the long road still ahead of him."
+
+class FireModel:
+    # stands in for the classifier: anything burning also reads as lava, like the trained model does
+    def classify_uncached(self, texts):
+        out = []
+        for t in texts:
+            kw = STORY_MATCHER.labels(t); labels = kw + ["lava"] * ("fire" in t or "lava" in t)
+            out.append({"mode": "knight", "source": "model", "labels": labels, "probs": dict.fromkeys(labels, 0.9), "keywords": kw})
+        return out
+
+def mixed_story(per_section=20):
+    lines = []
+    for sentence in (FOREST, DESERT, LAVA):
+        for i in range(per_section):
+            lines.append(sentence if i % 2 == 0 else FILLER)
+    return lines
+
+def test_windows_respect_word_limit():
+    windows = list(iter_windows(mixed_story(), 40))
+    assert windows and all(len(w.split()) <= 40 for w in windows)
+    assert sum(len(w.split()) for w in windows) == sum(len(l.split()) for l in mixed_story())
+
+def test_mixed_biome_story_does_not_alternate():
+    tl = analyze(iter_windows(mixed_story(), 40), FireModel(), min_windows=1)
+    assert [s["biome"] for s in tl["segments"]] == ["forest", "desert", "lava"]
+    assert all(b["start"] == a["end"] + 1 for a, b in zip(tl["segments"], tl["segments"][1:]))
+
+def test_short_segments_fold_into_neighbours():
+    lines = [FOREST] * 12 + [DESERT] + [FOREST] * 12
+    tl = analyze(iter_windows(lines, 20), None, min_windows=2)
+    assert [s["biome"] for s in tl["segments"]] == ["forest"]
+
+def test_compress_caps_levels():
+    biomes = ["forest", "desert", "lava", "graveyard"] * 10
+    segments = [{"biome": b, "start": i, "end": i, "windows": 1 + i % 3, "labels": []} for i, b in enumerate(biomes)]
+    out = compress(segments, 6)
+    assert 1 <= len(out) <= 6
+    assert out[0]["start"] == 0 and out[-1]["end"] == len(biomes) - 1
+    assert all(a["biome"] != b["biome"] for a, b in zip(out, out[1:]))
+    assert len(list(iter_timeline("knight", out))) == len(out)
@@ -0,0 +1,140 @@
+import re, sys, json, time, argparse
+from classifier import StoryClassifier, iter_batches
+from keywords import STORY_MATCHER
+from levelgen import DEFAULT_SPEC, iter_timeline, load_spec
+
+WINDOW_WORDS = 120
+MIN_WINDOWS = 2      # biome segments backed by fewer windows are passing mentions and fold into a neighbour
+MAX_SEGMENTS = 12    # longer timelines are compressed to this many segments, i.e. at most this many levels
+ANALYZER_VERSION = 2
+SENTENCE_END = re.compile(r"(?<=[.!?])[\"')\]]*\s+")
+
+def iter_windows(lines, max_words=WINDOW_WORDS):
+    # sentences are packed into windows of at most max_words words; a blank line (or WritingPrompts' <newline>) ends a
+    # paragraph, which also closes the window once it is a quarter full. Only the current window is ever held.
+    buf = []; n = 0; min_words = max(1, max_words // 4)
+    for line in lines:
+        for part in line.rstrip("\r\n").replace("<newline>", "\n").split("\n"):
+            if not part.strip():
+                if n >= min_words:
+                    yield " ".join(buf); buf = []; n = 0
+                continue
+            for sentence in SENTENCE_END.split(part):
+                words = sentence.split()
+                if n and n + len(words) > max_words:
+                    yield " ".join(buf); buf = []; n = 0
+                while len(words) > max_words:
+                    yield " ".join(words[:max_words]); words = words[max_words:]
+                if words:
+                    buf.append(" ".join(words)); n += len(words)
+    if buf:
+        yield " ".join(buf)
+
+def window_biome(text, res, biome_of, current=None):
+    # the one biome a window is about: the one its keywords mention most, else the model's most probable one.
+    # A tie keeps the current segment's biome, so a window mentioning two biomes does not flip the timeline back and forth
+    score = {}
+    for _, l in STORY_MATCHER.finditer(text):
+        if l in biome_of: score[biome_of[l]] = score.get(biome_of[l], 0) + 1
+    if not score:
+        probs = res.get("probs", {})
+        for l in res["labels"]:
+            if l in biome_of: score[biome_of[l]] = max(score.get(biome_of[l], 0), probs.get(l, 0))
+    if not score:
+        return None
+    best = max(score.values())
+    return current if score.get(current) == best else next(b for b, v in score.items() if v == best)
+
+def analyze(windows, classifier=None, spec=None, batch=256, min_windows=MIN_WINDOWS, max_segments=MAX_SEGMENTS):
+    # windows are classified a batch at a time in one predict call each. Each window's dominant biome extends the
+    # timeline; consecutive windows in the same biome form one segment, and the other labels of its windows (enemy,
+    # treasure, ...) travel with it; those seen before the first biome go to the first segment
+    biome_of = {l: fx["biome"] for l, fx in (spec or DEFAULT_SPEC)["knight"]["labels"].items() if "biome" in fx}
+    segments = []; lead = []; labels = {}; model_labels = {}; modes = {"knight": 0, "space": 0}; sources = {}; n = 0; words = 0
+    for texts in iter_batches(windows, batch):
+        results = classifier.classify_uncached(texts) if classifier else \
+                  [{"mode": "knight", "source": "fallback", "labels": [], "keywords": kw} for kw in map(STORY_MATCHER.labels, texts)]
+        for text, res in zip(texts, results):
+            found = res["keywords"] + [l for l in res["labels"] if l not in res["keywords"]]
+            modes[res["mode"]] += 1; sources[res["source"]] = sources.get(res["source"], 0) + 1
+            labels.update(dict.fromkeys(found)); model_labels.update(dict.fromkeys(res["labels"]))
+            biome = window_biome(text, res, biome_of, segments[-1]["biome"] if segments else None)
+            if biome is not None:
+                if not segments or segments[-1]["biome"] != biome:
+                    segments.append({"biome": biome, "start": n, "end": n, "windows": 0, "labels": [] if segments else lead})
+                segments[-1]["windows"] += 1
+            seg = segments[-1] if segments else {"labels": lead}; seg["end"] = n
+            seg["labels"] += [l for l in found if l not in biome_of and l not in seg["labels"]]
+            n += 1; words += len(text.split())
+    if min_windows > 1:
+        segments = smooth(segments, min_windows)
+    if max_segments:
+        segments = compress(segments, max_segments)
+    return {"windows": n, "words": words, "mode": "space" if modes["space"] else "knight", "modes": modes, "sources": sources,
+            "labels": list(labels), "model_labels": list(model_labels), "segments": segments}
+
+def smooth(segments, min_windows):
+    # passing mentions: a segment backed by fewer windows folds into the one before it (the first kept one, at the start)
+    if not any(s["windows"] >= min_windows for s in segments):
+        return segments
+    out = []; lead = []
+    for s in segments:
+        if s["windows"] < min_windows:
+            if out: absorb(out[-1], s, False)
+            else: lead.append(s)
+        elif out and out[-1]["biome"] == s["biome"]:
+            absorb(out[-1], s, True)
+        else:
+            out.append(dict(s, labels=list(s["labels"])))
+            for short in lead: absorb(out[-1], short, False)
+            lead = []
+    return out
+
+def compress(segments, max_segments):
+    # while there are too many, the segment with the fewest windows folds into its shorter neighbour, which then joins
+    # up with a same-biome segment on its other side
+    out = [dict(s, labels=list(s["labels"])) for s in segments]
+    while len(out) > max(1, max_segments):
+        i = min(range(len(out)), key=lambda i: out[i]["windows"])
+        j = i - 1 if i == len(out) - 1 or (i and out[i - 1]["windows"] <= out[i + 1]["windows"]) else i + 1
+        absorb(out[j], out.pop(i), False)
+        j = min(j, i)   # out[j] is where the neighbour now sits
+        for k in (j + 1, j):
+            if 0 < k < len(out) and out[k - 1]["biome"] == out[k]["biome"]:
+                absorb(out[k - 1], out.pop(k), True)
+    return out
+
+def absorb(seg, other, same_biome):
+    seg["start"] = min(seg["start"], other["start"]); seg["end"] = max(seg["end"], other["end"])
+    if same_biome: seg["windows"] += other["windows"]
+    seg["labels"] += [l for l in other["labels"] if l not in seg["labels"]]
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Split a long story into windows, classify them and print its level timeline")
+    ap.add_argument("story", help="story file ('-' for stdin); read line by line, so books are fine")
+    ap.add_argument("--window", type=int, default=WINDOW_WORDS, help="words per classified window")
+    ap.add_argument("--batch", type=int, default=256, help="windows per predict call")
+    ap.add_argument("--min-windows", type=int, default=MIN_WINDOWS, help="fold biome segments backed by fewer windows into their neighbour")
+    ap.add_argument("--max-segments", type=int, default=MAX_SEGMENTS, help="compress the timeline to at most this many segments (0: no limit)")
+    ap.add_argument("--no-model", action="store_true", help="keyword labels only")
+    ap.add_argument("--levels", action="store_true", help="also print the generated knight levels, one JSON line each")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--spec", help="JSON level spec replacing the built-in one")
+    args = ap.parse_args(argv)
+
+    spec = load_spec(args.spec); clf = None
+    if not args.no_model:
+        clf = StoryClassifier(); clf.load()
+    t0 = time.perf_counter()
+    f = sys.stdin if args.story == "-" else open(args.story, encoding="utf-8", errors="replace")
+    with f:
+        result = analyze(iter_windows(f, args.window), clf, spec, args.batch, args.min_windows, args.max_segments)
+    result["seconds"] = round(time.perf_counter() - t0, 3)
+    print(json.dumps(result))
+    if args.levels:
+        for level in iter_timeline("knight", result["segments"], None, args.seed, spec):
+            print(json.dumps(level))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+import os, re, sys, json, time, argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from pregen import iter_stories, iter_shards
+from classifier import MODEL_PATH, VECT_PATH, MLB_PATH, NPZ_PATH
+
+# the notebook's get_labels rules, compiled once and applied to whole chunks in the worker processes
+LEVEL_PATTERNS = {
+    "castle": r"castle|fortress|kingdom",
+    "enemy": r"enemy|dragon|monster|beast",
+    "forest": r"forest|woods",
+    "lava": r"lava|fire|volcano",
+    "treasure": r"treasure|gold|crown|jewel",
+}
+LABELS = sorted(LEVEL_PATTERNS)
+COMPILED = [re.compile(LEVEL_PATTERNS[l]) for l in LABELS]
+
+def label_matrix(texts):
+    y = np.zeros((len(texts), len(LABELS)), np.int8)
+    for i, text in enumerate(texts):
+        text = text.lower()
+        for j, rx in enumerate(COMPILED):
+            if rx.search(text): y[i, j] = 1
+    return y
+
+def make_vectorizer(n_features):
+    from sklearn.feature_extraction.text import HashingVectorizer
+    return HashingVectorizer(n_features=n_features, stop_words="english", alternate_sign=False, norm="l2")
+
+WORKER = {}
+
+def init_worker(n_features):
+    WORKER["vect"] = make_vectorizer(n_features)
+
+def featurize(texts):
+    return WORKER["vect"].transform(texts), label_matrix(texts)
+
+def iter_features(path, field, chunk, workers, n_features):
+    # chunks come back in corpus order; only two per worker are ever held, however big the corpus
+    with ProcessPoolExecutor(workers, initializer=init_worker, initargs=(n_features,)) as pool:
+        pending = deque()
+        for texts in iter_shards(iter_stories(path, field), chunk):
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+            pending.append(pool.submit(featurize, texts))
+        while pending:
+            yield pending.popleft().result()
+
+def f1_report(y, p):
+    out = {}
+    for j, label in enumerate(LABELS):
+        tp = int(((y[:, j] == 1) & (p[:, j] == 1)).sum()); fp = int(((y[:, j] == 0) & (p[:, j] == 1)).sum())
+        fn = int(((y[:, j] == 1) & (p[:, j] == 0)).sum())
+        out[label] = round(2 * tp / (2 * tp + fp + fn), 3) if tp else 0.0
+    return out
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Stream a story corpus through HashingVectorizer + SGD and write the model files the game loads")
+    ap.add_argument("input", help="corpus: one story per line (e.g. train.wp_target) or JSON lines (.jsonl), optionally .gz")
+    ap.add_argument("--field", default="story", help="story field for .jsonl inputs")
+    ap.add_argument("--out-dir", default=".", help="where story_model.joblib, vectorizer.joblib and mlb.joblib are written")
+    ap.add_argument("--chunk", type=int, default=4096, help="stories per partial_fit step")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="processes labelling and hashing chunks")
+    ap.add_argument("--features", type=int, default=2**18, help="hashed feature space size")
+    ap.add_argument("--epochs", type=int, default=1)
+    ap.add_argument("--alpha", type=float, default=1e-6, help="SGD regularization strength")
+    ap.add_argument("--holdout", type=int, default=20, help="every Nth chunk is held out for evaluation (0 disables)")
+    ap.add_argument("--holdout-max", type=int, default=20000, help="cap on held-out stories kept in memory")
+    args = ap.parse_args(argv)
+
+    import joblib
+    from scipy.sparse import vstack
+    from sklearn.linear_model import SGDClassifier
+    from sklearn.multioutput import MultiOutputClassifier
+    from sklearn.preprocessing import MultiLabelBinarizer
+
+    model = MultiOutputClassifier(SGDClassifier(loss="log_loss", alpha=args.alpha, random_state=0))
+    classes = [np.array([0, 1])] * len(LABELS)
+    held_x = []; held_y = []; held = 0; seen = 0; positives = np.zeros(len(LABELS), np.int64)
+    t0 = time.perf_counter()
+    for epoch in range(args.epochs):
+        for k, (x, y) in enumerate(iter_features(args.input, args.field, args.chunk, args.workers, args.features)):
+            if args.holdout and k % args.holdout == args.holdout - 1:
+                if epoch == 0 and held < args.holdout_max:
+                    take = min(x.shape[0], args.holdout_max - held)
+                    held_x.append(x[:take]); held_y.append(y[:take]); held += take
+                continue
+            model.partial_fit(x, y, classes=classes)
+            seen += x.shape[0]
+            if epoch == 0: positives += y.sum(axis=0)
+            rate = seen / max(1e-9, time.perf_counter() - t0)
+            print(f"\repoch {epoch + 1}/{args.epochs}: {seen} stories trained ({rate:.0f}/s)", end="", file=sys.stderr)
+    print(file=sys.stderr)
+    if not seen:
+        raise SystemExit("no stories were read from " + args.input)
+    elapsed = time.perf_counter() - t0
+
+    # only hashed features that occurred carry weight, so sparse coefficients keep the pickle small
+    for est in model.estimators_:
+        est.sparsify()
+    os.makedirs(args.out_dir, exist_ok=True)
+    mlb = MultiLabelBinarizer(classes=LABELS).fit([LABELS])
+    joblib.dump(model, os.path.join(args.out_dir, MODEL_PATH))
+    joblib.dump(make_vectorizer(args.features), os.path.join(args.out_dir, VECT_PATH))
+    joblib.dump(mlb, os.path.join(args.out_dir, MLB_PATH))
+    # a hashed vocabulary cannot go into the NumPy scorer's format. An older export is left in place: its recorded digests
+    # no longer match these files, so StoryClassifier.load_npz skips it and serves the joblib model
+    npz = os.path.join(args.out_dir, NPZ_PATH)
+    if os.path.exists(npz):
+        print(f"Note: {npz} is now stale and will be ignored (the hashing model is served through joblib)", file=sys.stderr)
+
+    summary = {"stories": seen, "epochs": args.epochs, "seconds": round(elapsed, 2), "stories_per_sec": round(seen / elapsed),
+               "positives": dict(zip(LABELS, positives.tolist())), "out_dir": args.out_dir}
+    if held:
+        hx = vstack(held_x); hy = np.vstack(held_y)
+        summary["holdout"] = held; summary["holdout_f1"] = f1_report(hy, model.predict(hx))
+    print(json.dumps(summary))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())